@@ -1,37 +1,100 @@
-from models import Position, Direction, GameState, Perception
+from models import Direction, Percept, BREEZE, STENCH, GLITTER
 from environment import WumpusEnvironment
+import copy
 import random
 import heapq
-import json
 import os
+from time import perf_counter
+from contextlib import contextmanager
+from functools import lru_cache
+from knowledge_log import KnowledgeLogWriter, KnowledgeStore
+from planner import DistanceField, nearest_step
+from bitboard import BitBoard
+from inference import pit_posteriors, wumpus_posteriors
+from transposition import ZobristHash, SAFE, VISITED, UNSAFE, UNKNOWN, BREEZY, STENCHY
+
+# Largest cave whose risk ties follow the original agent's set order exactly (see tie_rank)
+SET_ORDER_MAX_SIZE = 16
+
+
+@lru_cache(maxsize=SET_ORDER_MAX_SIZE)
+def unknown_set_order(size):
+    """
+    Rank of each square in the iteration order of the set of unknown squares the agent used to
+    start with. The risk step breaks distance ties in this order, as when it scanned that set.
+    """
+    unknown = {(x, y) for x in range(1, size + 1) for y in range(1, size + 1)} - {(1, 1)}
+    return {cell: rank for rank, cell in enumerate(unknown)}
+
+
+def tie_rank(size, cell):
+    """
+    Tie-break rank of a risk candidate: its place in unknown_set_order up to SET_ORDER_MAX_SIZE.
+    Larger caves never had a set order to keep and would pay for a whole-grid table, so they use
+    the tuple hash that set order is derived from, with no table at all.
+    """
+    if size <= SET_ORDER_MAX_SIZE:
+        return unknown_set_order(size)[cell]
+    return hash(cell)
+
 
-# Modify the `save_json` method to handle non-serializable objects
 class KnowledgeBase:
-    def __init__(self):
-        self.log = []
+    def __init__(self, keyframe_every: int = 64):
+        # Columnar, delta-encoded history; see KnowledgeStore for beliefs(i) and records_at(x, y)
+        self.log = KnowledgeStore(keyframe_every)
+        self.writer = None
 
     def tell(self, entry):
-        self.log.append(entry)
+        if self.writer is not None:
+            self.writer.write(entry)
+        else:
+            self.log.append(entry)
 
-    def save_json(self, filename):
-        def serialize(obj):
-            if isinstance(obj, Perception):
-                return {
-                    'stench': obj.stench,
-                    'breeze': obj.breeze,
-                    'glitter': obj.glitter
-                }
-            return obj
+    @contextmanager
+    def stream(self, filename, binary=False, flush_every=0, flush_interval=0):
+        """
+        Streams entries to an append-only log instead of keeping them in `log`.
+        While the stream is open, save_json is a no-op - use iter_records to read the log back.
+        """
+        with KnowledgeLogWriter(self.path(filename), binary, flush_every, flush_interval) as writer:
+            self.writer = writer
+            try:
+                yield writer
+            finally:
+                self.writer = None
 
+    @staticmethod
+    def path(filename):
         temp_dir = os.getenv('TEMP', '/tmp')
-        file_path = os.path.join(temp_dir, filename)
-        with open(file_path, 'w') as f:
-            json.dump(self.log, f, indent=2, default=serialize)
+        return os.path.join(temp_dir, filename)
+
+    def save_json(self, filename):
+        if self.writer is not None:
+            return  # Entries are already on their way to disk
+        self.log.save_json(self.path(filename))
 
 class EnhancedAgent:
-    def __init__(self, risk_prob=0.25, risk_threshold=5):
+    def __init__(self, risk_prob=0.25, risk_threshold=5, size=4, pits=3, use_posteriors=False, belief_cache=None,
+                 stats=None, planner=None, transpositions=None):
+        self.size = size
+        self.pits = pits
+        # Optional BeliefCache, usually shared by every agent in a process
+        self.belief_cache = belief_cache
+        # Optional instrumentation.AgentStats; when None nothing is timed or recorded
+        self.stats = stats
+        # Optional montecarlo.MonteCarloPlanner that picks actions in place of the rule cascade
+        self.planner = planner
+        # Optional transposition.TranspositionTable of decisions by knowledge state, usually shared
+        # by every agent in a process; a hit returns exactly what choose_step would have
+        self.transpositions = transpositions
+        # Which branch of decide() picked the last action (see instrumentation.BRANCHES)
+        self.decision = None
+        # With use_posteriors, the risk step enters the least dangerous unknown square by exact posterior.
+        # Squares more dangerous than risk_prob are only entered risk_threshold times; after that the agent
+        # heads home and climbs out instead.
         self.risk_prob = risk_prob
         self.risk_threshold = risk_threshold
+        self.use_posteriors = use_posteriors
         self.reset()
 
     def reset(self):
@@ -40,32 +103,140 @@ class EnhancedAgent:
         self.has_gold = False
         self.arrow = True
         self.performance = 0
-        self.safe = {(1, 1)}
-        self.visited = set()
-        self.unknown = {(x, y) for x in range(1, 5) for y in range(1, 5)} - {(1, 1)}
-        self.unsafe = set()
+        # Knowledge sets are bitboards so large caves cost one bit per cell, not a tuple per cell
+        self.safe = BitBoard(self.size, [(1, 1)])
+        self.visited = BitBoard(self.size)
+        self.unknown = BitBoard.full(self.size)
+        self.unknown.discard((1, 1))
+        # Frontier indices, patched cell by cell as knowledge changes (see mark_*):
+        # frontier - safe squares not visited yet
+        # backtrack - visited squares next to a frontier square
+        # risk_candidates - unknown squares, not known unsafe, next to a known square
+        self.frontier = BitBoard(self.size, [(1, 1)])
+        self.backtrack = BitBoard(self.size)
+        self.risk_candidates = BitBoard(self.size, [(2, 1), (1, 2)] if self.size > 1 else [])
+        self.unsafe = BitBoard(self.size)
         self.wumpus_inferred = False
         self.wumpus_location = None
         self.risky_target = None
         self.belief_pit = {}
         self.belief_wumpus = {}
+        # Posterior shared by every possible square missing from belief_pit / belief_wumpus
+        self.belief_pit_other = 0.0
+        self.belief_wumpus_other = 0.0
+        # Squares that may still hold a pit / the Wumpus; every other square is known clear of it
+        self.pit_possible = BitBoard(self.size)
+        self.wumpus_possible = BitBoard(self.size)
+        self.breezy = BitBoard(self.size)
+        self.stenchy = BitBoard(self.size)
+        self.wumpus_dead = False
+        self.risks_taken = 0
         self.kb = KnowledgeBase()
+        # AIDEV-NOTE: safe/unsafe/visited only grow and unknown only shrinks; go through mark_* so
+        # home_field and the frontier indices above stay in sync.
+        self.home_field = DistanceField({(1, 1)}, self.passable, self.neighbor_cells, self.stats)
+        # Counts update_beliefs calls, so decide() can tell which decisions refreshed the posteriors
+        self.belief_updates = 0
+        self.zobrist = ZobristHash(self) if self.transpositions is not None else None
+
+    def clone(self) -> 'EnhancedAgent':
+        """Copy of the agent's position and knowledge for simulation; no stats, planner or knowledge log."""
+        other = copy.copy(self)
+        for name in ('safe', 'visited', 'unknown', 'unsafe', 'breezy', 'stenchy', 'frontier', 'backtrack',
+                     'risk_candidates'):
+            setattr(other, name, getattr(self, name).copy())
+        other.home_field = copy.copy(self.home_field)
+        other.home_field.dist = dict(self.home_field.dist)
+        other.home_field.passable = other.passable
+        other.home_field.neighbors = other.neighbor_cells
+        other.home_field.stats = None
+        other.zobrist = copy.copy(self.zobrist)
+        other.stats = other.planner = None
+        other.kb = KnowledgeBase()
+        return other
+
+    def passable(self, cell):
+        return cell in self.safe and cell not in self.unsafe
+
+    def mark_safe(self, cell):
+        if cell not in self.safe:
+            self.safe.add(cell)
+            if self.zobrist is not None:
+                self.zobrist.toggle(SAFE, cell)
+            self.home_field.add_passable(cell)
+            if cell not in self.visited:
+                self.frontier.add(cell)
+                for n in self.neighbor_cells(cell):
+                    if n in self.visited:
+                        self.backtrack.add(n)
+
+    def mark_unsafe(self, cell):
+        if cell not in self.unsafe:
+            self.unsafe.add(cell)
+            if self.zobrist is not None:
+                self.zobrist.toggle(UNSAFE, cell)
+            self.risk_candidates.discard(cell)
+            if cell in self.home_field.dist:
+                self.home_field.rebuild()
+
+    def mark_visited(self, cell):
+        if cell in self.visited:
+            return
+        self.visited.add(cell)
+        if self.zobrist is not None:
+            self.zobrist.toggle(VISITED, cell)
+        if cell in self.frontier:
+            self.frontier.discard(cell)
+            for n in self.neighbor_cells(cell):
+                if n in self.backtrack and not any(m in self.frontier for m in self.neighbor_cells(n)):
+                    self.backtrack.discard(n)
+        if any(n in self.frontier for n in self.neighbor_cells(cell)):
+            self.backtrack.add(cell)
+
+    def mark_known(self, cell):
+        if cell in self.unknown:
+            self.unknown.discard(cell)
+            if self.zobrist is not None:
+                self.zobrist.toggle(UNKNOWN, cell)
+            self.risk_candidates.discard(cell)
+            for n in self.neighbor_cells(cell):
+                if n in self.unknown and n not in self.unsafe:
+                    self.risk_candidates.add(n)
+
+    def neighbor_cells(self, cell):
+        # Same cells and order as neighbors(), without the generator overhead (distance fields call this a lot)
+        x, y = cell
+        cells = []
+        if x < self.size:
+            cells.append((x + 1, y))
+        if y < self.size:
+            cells.append((x, y + 1))
+        if x > 1:
+            cells.append((x - 1, y))
+        if y > 1:
+            cells.append((x, y - 1))
+        return cells
 
     def neighbors(self, x, y):
         for d, (dx, dy) in enumerate([(1, 0), (0, 1), (-1, 0), (0, -1)]):
             nx, ny = x + dx, y + dy
-            if 1 <= nx <= 4 and 1 <= ny <= 4:
+            if 1 <= nx <= self.size and 1 <= ny <= self.size:
                 yield nx, ny, d
 
     def a_star(self, start, goal, allow_unknown=False):
         def manhattan(a, b):
             return abs(a[0] - b[0]) + abs(a[1] - b[1])
+        began = perf_counter() if self.stats is not None else 0.0
         frontier = [(0 + manhattan(start, goal), 0, start, [])]
         visited = {start: 0}
+        expanded = pushes = 0
         while frontier:
             _, g, current, path = heapq.heappop(frontier)
             if current == goal:
+                if self.stats is not None:
+                    self.stats.record_a_star(expanded, pushes, perf_counter() - began)
                 return path
+            expanded += 1
             for nx, ny, _ in self.neighbors(*current):
                 if (nx, ny) in self.unsafe:
                     continue
@@ -74,25 +245,124 @@ class EnhancedAgent:
                     if (nx, ny) not in visited or ng < visited[(nx, ny)]:
                         visited[(nx, ny)] = ng
                         heapq.heappush(frontier, (ng + manhattan((nx, ny), goal), ng, (nx, ny), path + [(nx, ny)]))
+                        pushes += 1
+        if self.stats is not None:
+            self.stats.record_a_star(expanded, pushes, perf_counter() - began)
         return None
 
-    def choose_action(self, perception: Perception, bump=False, scream=False) -> str:
-        self.visited.add((self.x, self.y))
-        self.unknown.discard((self.x, self.y))
-        stench, breeze, glitter = perception.stench, perception.breeze, perception.glitter
+    def move_towards(self, cell):
+        nx, ny = cell
+        if nx > self.x:
+            return "MOVE_EAST"
+        elif nx < self.x:
+            return "MOVE_WEST"
+        elif ny > self.y:
+            return "MOVE_NORTH"
+        elif ny < self.y:
+            return "MOVE_SOUTH"
+
+    def frontier_step(self):
+        """Next step towards the nearest reachable frontier square, or None."""
+        return nearest_step((self.x, self.y), self.frontier.__contains__, self.passable, self.neighbor_cells,
+                            self.stats)
+
+    def backtrack_step(self):
+        # Visited squares next to an unvisited safe square, to backtrack to when the frontier is cut off
+        return nearest_step((self.x, self.y), self.backtrack.__contains__, self.passable, self.neighbor_cells,
+                            self.stats)
+
+    def record_percept(self, perception) -> Percept:
+        """Records a Percept (or Perception, converted here) for the current square and returns the Percept."""
+        if type(perception) is not Percept:
+            perception = Percept.of(perception)
+        here = (self.x, self.y)
+        self.mark_visited(here)
+        self.mark_known(here)
+        if perception & BREEZE and here not in self.breezy:
+            self.breezy.add(here)
+            if self.zobrist is not None:
+                self.zobrist.toggle(BREEZY, here)
+        if perception & STENCH and not self.wumpus_dead and here not in self.stenchy:
+            self.stenchy.add(here)
+            if self.zobrist is not None:
+                self.zobrist.toggle(STENCHY, here)
+        return perception
+
+    def choose_action(self, perception: Percept, bump=False, scream=False) -> str:
+        # AIDEV-NOTE: keep the default path to two attribute checks - this runs once per step.
+        if self.stats is None and self.planner is None:
+            return self.decide(perception, bump, scream)
+        start = perf_counter()
+        # decide() also folds the percept into the knowledge base, so it runs even when planning
+        action = self.decide(perception, bump, scream)
+        if self.planner is not None and self.decision != 'grab':
+            action = self.planner.choose(self, action)
+            self.decision = 'monte_carlo'
+        if self.stats is not None:
+            self.stats.record_decision(self.decision, perf_counter() - start)
+        return action
+
+    def decide(self, perception: Percept, bump=False, scream=False) -> str:
+        """The decision procedure behind choose_action; sets self.decision to the branch that decided."""
+        bits = self.record_percept(perception)
+        stench, breeze, glitter = bits & STENCH, bits & BREEZE, bits & GLITTER
 
         if breeze:
             potentials = [(nx, ny) for nx, ny, _ in self.neighbors(self.x, self.y) if (nx, ny) in self.unknown]
             if len(potentials) == 1:
-                self.unsafe.add(potentials[0])
-                self.unknown.discard(potentials[0])
+                self.mark_unsafe(potentials[0])
+                self.mark_known(potentials[0])
 
         if stench and self.arrow and not self.wumpus_inferred:
             potentials = [(nx, ny, d) for nx, ny, d in self.neighbors(self.x, self.y) if (nx, ny) in self.unknown]
             if len(potentials) == 1:
                 self.wumpus_inferred = True
                 self.wumpus_location = potentials[0]
+        # A Wumpus hunt acts on the knowledge as it stands, before rooms around are marked safe
+        hunting = self.wumpus_inferred and self.arrow and self.wumpus_location is not None
+        if not hunting:
+            if not stench and not breeze:
+                for nx, ny, _ in self.neighbors(self.x, self.y):
+                    if (nx, ny) not in self.unsafe:
+                        self.mark_safe((nx, ny))
+                        self.mark_known((nx, ny))
+
+            if scream:
+                self.arrow = False
+                self.wumpus_inferred = False
+                self.wumpus_dead = True
+                self.stenchy.clear()
+                self.safe.fill()
+                self.home_field.rebuild()
+                self.frontier = self.safe - self.visited
+                self.backtrack = self.visited & self.frontier.neighbours()
+                if self.zobrist is not None:
+                    self.zobrist.rebuild(self)
+
+        table = self.transpositions
+        if table is None:
+            return self.choose_step(glitter)
+        key = self.zobrist.key(self, bool(glitter))
+        hit = table.get(key)
+        if hit is not None:
+            action, self.decision = hit
+            if self.decision == 'grab':
+                self.has_gold = True
+            return action
+        updates = self.belief_updates
+        action = self.choose_step(glitter)
+        # Decisions that refreshed the posteriors also changed belief_pit / belief_wumpus, which a hit could not replay
+        if self.belief_updates == updates:
+            table.put(key, action, self.decision)
+        return action
+
+    def choose_step(self, glitter) -> str:
+        """
+        The action for the knowledge decide() has just updated. Reads nothing but what
+        transposition.ZobristHash.key covers, so its result can be cached.
+        """
         if self.wumpus_inferred and self.arrow and self.wumpus_location is not None:
+            self.decision = 'wumpus'
             wx, wy, wd = self.wumpus_location
             # Move to the cell facing the Wumpus and shoot
             if (self.x, self.y) == (wx, wy):
@@ -107,111 +377,89 @@ class EnhancedAgent:
             elif wy < self.y:
                 return "MOVE_SOUTH"
 
-        if not stench and not breeze:
-            for nx, ny, _ in self.neighbors(self.x, self.y):
-                if (nx, ny) not in self.unsafe:
-                    self.safe.add((nx, ny))
-                    self.unknown.discard((nx, ny))
-
-        if scream:
-            self.arrow = False
-            self.wumpus_inferred = False
-            for x in range(1, 5):
-                for y in range(1, 5):
-                    self.safe.add((x, y))
-
         if glitter and not self.has_gold:
+            self.decision = 'grab'
             self.has_gold = True
             return "GRAB"
         if self.has_gold:
-            path = self.a_star((self.x, self.y), (1, 1))
-            if path:
-                nx, ny = path[0]
-                if nx > self.x:
-                    return "MOVE_EAST"
-                elif nx < self.x:
-                    return "MOVE_WEST"
-                elif ny > self.y:
-                    return "MOVE_NORTH"
-                elif ny < self.y:
-                    return "MOVE_SOUTH"
+            self.decision = 'gold_return'
+            step = self.home_field.next_step((self.x, self.y))
+            if step:
+                return self.move_towards(step)
             return "CLIMB"
 
-        # Prefer safe frontier, but if none, backtrack to last visited square with safe moves
-        safe_frontier = [cell for cell in self.safe if cell not in self.visited]
-        if safe_frontier:
-            safe_frontier.sort(key=lambda c: abs(self.x - c[0]) + abs(self.y - c[1]))
-            target = safe_frontier[0]
-            path = self.a_star((self.x, self.y), target)
-            if path:
-                nx, ny = path[0]
-                if nx > self.x:
-                    return "MOVE_EAST"
-                elif nx < self.x:
-                    return "MOVE_WEST"
-                elif ny > self.y:
-                    return "MOVE_NORTH"
-                elif ny < self.y:
-                    return "MOVE_SOUTH"
-        # If no safe moves from current square, backtrack to last visited square with unvisited safe neighbors
-        for prev in reversed(list(self.visited)):
-            unvisited_safe = [n for n in self.neighbors(*prev) if (n[0], n[1]) in self.safe and (n[0], n[1]) not in self.visited]
-            if unvisited_safe:
-                path = self.a_star((self.x, self.y), prev)
-                if path:
-                    nx, ny = path[0]
-                    if nx > self.x:
-                        return "MOVE_EAST"
-                    elif nx < self.x:
-                        return "MOVE_WEST"
-                    elif ny > self.y:
-                        return "MOVE_NORTH"
-                    elif ny < self.y:
-                        return "MOVE_SOUTH"
+        # Prefer the nearest safe frontier, but if none is reachable, backtrack to the nearest
+        # visited square with an unvisited safe neighbour
+        self.decision = 'frontier'
+        step = self.frontier_step()
+        if not step:
+            self.decision = 'backtrack'
+            step = self.backtrack_step()
+        if step:
+            return self.move_towards(step)
+        self.decision = 'risk'
         # If no unknowns left or all are unsafe, or no way to backtrack, take a risk
-        risky_candidates = [cell for cell in self.unknown if cell not in self.unsafe]
-        if risky_candidates:
-            risky_candidates.sort(key=lambda c: abs(self.x - c[0]) + abs(self.y - c[1]))
+        # The nearest unknown square always borders a known one, so only the boundary is considered
+        risky_candidates = list(self.risk_candidates)
+        if risky_candidates and self.use_posteriors:
+            step = self.risk_step(risky_candidates)
+            if step:
+                return self.move_towards(step)
+            self.decision = 'risk_retreat'
+            step = self.home_field.next_step((self.x, self.y))
+            if step:
+                return self.move_towards(step)
+        elif risky_candidates:
+            risky_candidates.sort(key=lambda c: (abs(self.x - c[0]) + abs(self.y - c[1]), tie_rank(self.size, c)))
             target = risky_candidates[0]
             path = self.a_star((self.x, self.y), target, allow_unknown=True)
             if path:
-                nx, ny = path[0]
-                if nx > self.x:
-                    return "MOVE_EAST"
-                elif nx < self.x:
-                    return "MOVE_WEST"
-                elif ny > self.y:
-                    return "MOVE_NORTH"
-                elif ny < self.y:
-                    return "MOVE_SOUTH"
+                return self.move_towards(path[0])
         # If no unknowns left or all are unsafe, climb out
+        self.decision = 'climb'
         return "CLIMB"
 
-    def update_beliefs(self, perception):
-        stench, breeze, glitter = perception.stench, perception.breeze, perception.glitter
-        neighbors = list(self.neighbors(self.x, self.y))
-
-        for cell in self.unknown:
-            prior_pit = self.belief_pit.get(cell, 1 / len(self.unknown))
-            prior_wumpus = self.belief_wumpus.get(cell, 1 / len(self.unknown))
+    def update_beliefs(self, perception=None):
+        """
+        Exact pit and Wumpus posteriors from every breeze and stench observed so far.
+        Only frontier squares get an entry in belief_pit / belief_wumpus; every other square in
+        pit_possible / wumpus_possible has belief_pit_other / belief_wumpus_other, the rest 0.
+        """
+        if perception is not None:
+            self.record_percept(perception)
+        self.belief_updates += 1
+        start = perf_counter() if self.stats is not None else 0.0
+        self.belief_pit, self.belief_pit_other, self.pit_possible = pit_posteriors(
+            self.size, self.visited, self.breezy, self.pits, self.belief_cache)
+        if self.wumpus_dead:
+            self.belief_wumpus, self.belief_wumpus_other, self.wumpus_possible = {}, 0.0, BitBoard(self.size)
+        else:
+            self.belief_wumpus, self.belief_wumpus_other, self.wumpus_possible = wumpus_posteriors(
+                self.size, self.visited, self.stenchy)
+        if self.stats is not None:
+            self.stats.record_belief_update(perf_counter() - start)
 
-            likelihood_pit = 1 if breeze and cell in neighbors else 0
-            likelihood_wumpus = 1 if stench and cell in neighbors else 0
+    def danger(self, cell):
+        pit = self.belief_pit.get(cell, self.belief_pit_other) if cell in self.pit_possible else 0.0
+        wumpus = self.belief_wumpus.get(cell, self.belief_wumpus_other) if cell in self.wumpus_possible else 0.0
+        return 1 - (1 - pit) * (1 - wumpus)
 
-            self.belief_pit[cell] = prior_pit * likelihood_pit
-            self.belief_wumpus[cell] = prior_wumpus * likelihood_wumpus
-
-        # Normalize beliefs
-        pit_sum = sum(self.belief_pit.values())
-        wumpus_sum = sum(self.belief_wumpus.values())
-
-        if pit_sum > 0:
-            for cell in self.belief_pit:
-                self.belief_pit[cell] /= pit_sum
-
-        if wumpus_sum > 0:
-            for cell in self.belief_wumpus:
-                self.belief_wumpus[cell] /= wumpus_sum
+    def risk_step(self, candidates):
+        """Next step towards the least dangerous candidate worth the risk, or None to give up."""
+        self.update_beliefs()
+        here = (self.x, self.y)
+        ranked = sorted(candidates, key=lambda c: (self.danger(c), abs(self.x - c[0]) + abs(self.y - c[1]), -c[0]))
+        for target in ranked:
+            if self.danger(target) > self.risk_prob and self.risks_taken >= self.risk_threshold:
+                return None
+            # Walk over known ground (safe or already survived) and step into the target last
+            step = nearest_step(here, target.__eq__, lambda c: c == target or c in self.visited or self.passable(c),
+                                self.neighbor_cells, self.stats)
+            if step:
+                if step == target and self.danger(target) > self.risk_prob:
+                    self.risks_taken += 1
+                return step
+        return None
 
     def log_knowledge(self, perception):
         self.kb.tell({
@@ -0,0 +1,137 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from models import Feature, BREEZE, STENCH, GLITTER
+
+# Same direction convention as WumpusEnvironment.move: 0=EAST, 1=NORTH, 2=WEST, 3=SOUTH
+DELTAS = np.array([(1, 0), (0, 1), (-1, 0), (0, -1)], dtype=np.int64)
+
+
+def _adjacent(plane: np.ndarray) -> np.ndarray:
+    """Cells orthogonally adjacent to any True cell of a (N, size, size) plane."""
+    out = np.zeros_like(plane)
+    out[:, 1:, :] |= plane[:, :-1, :]
+    out[:, :-1, :] |= plane[:, 1:, :]
+    out[:, :, 1:] |= plane[:, :, :-1]
+    out[:, :, :-1] |= plane[:, :, 1:]
+    return out
+
+
+class BatchWumpusEnvironment:
+    """
+    N independent caves held as (N, size, size) boolean feature planes, indexed [cave, x-1, y-1].
+    Follows the rules of WumpusEnvironment: same feature counts and placement, same bump and
+    arrow semantics. Breeze/stench/glitter are precomputed planes, so perceive() is one gather.
+    """
+
+    def __init__(self, n: int, size: int = 4, seed=None, pits: int = 3):
+        self.n = n
+        self.size = size
+        self.pits = pits
+        self.rng = np.random.default_rng(seed)
+        shape = (n, size, size)
+        self.pit = np.zeros(shape, dtype=bool)
+        self.wumpus = np.zeros(shape, dtype=bool)
+        self.gold = np.zeros(shape, dtype=bool)
+        self.breeze = np.zeros(shape, dtype=bool)
+        self.stench = np.zeros(shape, dtype=bool)
+        self.x = np.ones(n, dtype=np.int64)
+        self.y = np.ones(n, dtype=np.int64)
+        self.has_arrow = np.ones(n, dtype=bool)
+        self.init_grid()
+
+    def init_grid(self, caves: Optional[np.ndarray] = None):
+        """(Re)generates the given caves (default: all) and puts their agents back on (1, 1)."""
+        caves = np.arange(self.n) if caves is None else np.asarray(caves)
+        if caves.dtype == bool:
+            caves = np.flatnonzero(caves)
+        k = len(caves)
+        if k == 0:
+            return
+        cells = self.size * self.size
+        # Pick 2 + pits distinct cells per cave, excluding flat index 0 == (1, 1)
+        picks = np.argpartition(self.rng.random((k, cells - 1)), 2 + self.pits, axis=1)[:, :2 + self.pits] + 1
+        pit = np.zeros((k, cells), dtype=bool)
+        wumpus = np.zeros((k, cells), dtype=bool)
+        gold = np.zeros((k, cells), dtype=bool)
+        rows = np.arange(k)[:, None]
+        wumpus[rows[:, 0], picks[:, 0]] = True
+        gold[rows[:, 0], picks[:, 1]] = True
+        pit[rows, picks[:, 2:]] = True
+        shape = (k, self.size, self.size)
+        self.pit[caves] = pit.reshape(shape)
+        self.wumpus[caves] = wumpus.reshape(shape)
+        self.gold[caves] = gold.reshape(shape)
+        self.breeze[caves] = _adjacent(self.pit[caves])
+        self.stench[caves] = _adjacent(self.wumpus[caves])
+        self.x[caves] = 1
+        self.y[caves] = 1
+        self.has_arrow[caves] = True
+
+    def perceive(self, x: Optional[np.ndarray] = None, y: Optional[np.ndarray] = None) -> np.ndarray:
+        """Percept bitmask (BREEZE | STENCH | GLITTER) per cave at (x, y), default the agent positions."""
+        x = self.x if x is None else x
+        y = self.y if y is None else y
+        idx = (np.arange(self.n), x - 1, y - 1)
+        return (self.breeze[idx] * BREEZE | self.stench[idx] * STENCH | self.gold[idx] * GLITTER).astype(np.uint8)
+
+    def step(self, directions: np.ndarray, active: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Moves every active agent one cell in its direction (0=EAST, 1=NORTH, 2=WEST, 3=SOUTH).
+        Agents that would leave the cave stay put. Returns the bump mask.
+        """
+        d = DELTAS[np.asarray(directions)]
+        nx = self.x + d[:, 0]
+        ny = self.y + d[:, 1]
+        bump = (nx < 1) | (nx > self.size) | (ny < 1) | (ny > self.size)
+        move = ~bump if active is None else ~bump & active
+        self.x = np.where(move, nx, self.x)
+        self.y = np.where(move, ny, self.y)
+        return bump if active is None else bump & active
+
+    def shoot(self, directions: np.ndarray, active: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Fires the arrow of every active agent that still has one. The arrow kills the first
+        Wumpus in line, which is removed and its stench cleared. Returns the scream mask.
+        """
+        firing = self.has_arrow.copy() if active is None else self.has_arrow & active
+        self.has_arrow &= ~firing
+        caves = np.flatnonzero(firing)
+        scream = np.zeros(self.n, dtype=bool)
+        if len(caves) == 0:
+            return scream
+        d = DELTAS[np.asarray(directions)[caves]]
+        coords = np.arange(1, self.size + 1)
+        gx = coords[None, :, None]
+        gy = coords[None, None, :]
+        ax = self.x[caves][:, None, None]
+        ay = self.y[caves][:, None, None]
+        dx = d[:, 0][:, None, None]
+        dy = d[:, 1][:, None, None]
+        # Distance along the arrow's line; cells off the line or behind the agent get 0
+        steps = np.where(dx != 0, (gx - ax) * dx, (gy - ay) * dy)
+        on_line = np.where(dx != 0, gy == ay, gx == ax) & (steps > 0)
+        targets = self.wumpus[caves] & on_line
+        hit = targets.reshape(len(caves), -1).any(axis=1)
+        if hit.any():
+            hit_caves = caves[hit]
+            dist = np.where(targets[hit], steps[hit], np.iinfo(np.int64).max).reshape(len(hit_caves), -1)
+            first = dist.argmin(axis=1)
+            self.wumpus[hit_caves, first // self.size, first % self.size] = False
+            self.stench[hit_caves] = _adjacent(self.wumpus[hit_caves])
+            scream[hit_caves] = True
+        return scream
+
+    def is_terminal(self) -> np.ndarray:
+        """True where the agent stands on a pit or a live Wumpus."""
+        idx = (np.arange(self.n), self.x - 1, self.y - 1)
+        return self.pit[idx] | self.wumpus[idx]
+
+    def cave_grid(self, i: int) -> Dict[Tuple[int, int], Feature]:
+        """Cave i in the WumpusEnvironment.grid format, for cross-checking against the scalar rules."""
+        grid = {}
+        for plane, feature in ((self.wumpus, Feature.WUMPUS), (self.gold, Feature.GOLD), (self.pit, Feature.PIT)):
+            for x, y in zip(*np.nonzero(plane[i])):
+                grid[(int(x) + 1, int(y) + 1)] = feature
+        return grid
@@ -0,0 +1,87 @@
+import os
+import pickle
+from collections import OrderedDict
+from typing import Callable, List, Optional, Set, Tuple
+
+Cell = Tuple[int, int]
+
+# The eight symmetries of the square, applied to (x, y)
+SYMMETRIES = [
+    lambda x, y: (x, y), lambda x, y: (-x, y), lambda x, y: (x, -y), lambda x, y: (-x, -y),
+    lambda x, y: (y, x), lambda x, y: (-y, x), lambda x, y: (y, -x), lambda x, y: (-y, -x),
+]
+
+
+def canonical_component(cells: List[Cell], constraints: List[Set[Cell]]) -> Tuple[tuple, List[Cell]]:
+    """
+    Signature of a frontier component that is the same for every translation, rotation and
+    reflection of it, plus the component's cells listed in the signature's cell order.
+    """
+    best = None
+    for transform in SYMMETRIES:
+        moved = {c: transform(*c) for c in cells}
+        min_x = min(x for x, _ in moved.values())
+        min_y = min(y for _, y in moved.values())
+        shape = sorted((x - min_x, y - min_y, c) for c, (x, y) in moved.items())
+        index = {c: i for i, (_, _, c) in enumerate(shape)}
+        key = (tuple((x, y) for x, y, _ in shape),
+               tuple(sorted(tuple(sorted(index[c] for c in con)) for con in constraints)))
+        if best is None or key < best[0]:
+            best = (key, [c for _, _, c in shape])
+    return best
+
+
+class BeliefCache:
+    """
+    LRU cache of frontier-component enumerations (see inference.pit_posteriors), keyed by the
+    component's canonical signature so the same local breeze pattern anywhere in any cave,
+    in any orientation, is enumerated once.
+    """
+
+    def __init__(self, maxsize: int = 100_000, path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.path = path
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def component(self, cells: List[Cell], constraints: List[Set[Cell]], max_pits: int, enumerate_fn: Callable):
+        """Returns (cells, total[k], per_cell[i][k]) like enumerate_fn, with cells in canonical order."""
+        signature, ordered = canonical_component(cells, constraints)
+        key = (signature, max_pits)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        else:
+            self.misses += 1
+            entry = enumerate_fn(ordered, constraints, max_pits)
+            self.entries[key] = entry
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        total, per_cell = entry
+        return ordered, total, per_cell
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate}
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(list(self.entries.items()), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def load(self, path: str):
+        with open(path, 'rb') as f:
+            for key, entry in pickle.load(f):
+                self.entries[key] = entry
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
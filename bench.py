@@ -0,0 +1,349 @@
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from statistics import median
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agent import EnhancedAgent
+from chunked_environment import ChunkedWumpusEnvironment
+from environment import WumpusEnvironment
+from generator import CaveGenerator
+from models import Feature, Pos
+from runner import episode_seed, run_episode
+
+# AIDEV-NOTE: every benchmark seeds its own caves, so numbers compare across commits; keep the seeds stable.
+DEFAULT_BASELINE = 'bench_baseline.json'
+# A fresh interpreter must import the headless core (runner and everything it pulls in) within this
+# many seconds, without loading any of HEADLESS_FORBIDDEN
+STARTUP_BUDGET = 0.1
+HEADLESS_FORBIDDEN = ('pygame', 'pydantic', 'numpy')
+
+# name -> setup(); setup returns (fn, ops): fn() is timed and does `ops` operations
+BENCHMARKS: Dict[str, Callable[[], Tuple[Callable[[], object], int]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def seeded_env(size: int = 4, seed: str = 'bench') -> WumpusEnvironment:
+    return WumpusEnvironment(size, seed=seed)
+
+
+def record_episode(size: int = 4, min_steps: int = 40, **agent_kwargs) -> List[tuple]:
+    """
+    Plays the first seeded episode lasting at least `min_steps` and returns what the agent saw at
+    each step as (x, y, arrow, perception, bump, scream), so choose_action can be replayed in isolation.
+    """
+    for index in range(1000):
+        env = seeded_env(size, episode_seed('bench', index))
+        agent = EnhancedAgent(size=size, **agent_kwargs)
+        calls = []
+        bump = scream = False
+        for _ in range(1000):
+            perception = env.percept(agent.x, agent.y)
+            calls.append((agent.x, agent.y, agent.arrow, perception, bump, scream))
+            action = agent.choose_action(perception, bump, scream)
+            bump, scream, died, _, climbed_out = agent.update_position(action, env)
+            if died or climbed_out:
+                break
+        if len(calls) >= min_steps:
+            return calls
+    raise RuntimeError("no seeded episode is long enough")
+
+
+def replay_agent(calls: List[tuple], size: int = 4, **agent_kwargs) -> EnhancedAgent:
+    agent = EnhancedAgent(size=size, **agent_kwargs)
+    for x, y, arrow, perception, bump, scream in calls:
+        agent.x, agent.y, agent.arrow = x, y, arrow
+        agent.choose_action(perception, bump, scream)
+    return agent
+
+
+@benchmark('env.get_perception')
+def bench_get_perception():
+    env = seeded_env()
+    positions = [Pos(x, y) for x in range(1, 5) for y in range(1, 5)]
+
+    def run():
+        for pos in positions:
+            env.get_perception(pos)
+    return run, len(positions)
+
+
+@benchmark('env.move')
+def bench_move():
+    env = seeded_env()
+    moves = [(x, y, d) for x in range(1, 5) for y in range(1, 5) for d in range(4)]
+
+    def run():
+        for x, y, d in moves:
+            env.move(x, y, d)
+    return run, len(moves)
+
+
+@benchmark('env.shoot')
+def bench_shoot():
+    # Without a Wumpus every arrow flies all the way to the wall, so nothing changes between runs
+    env = seeded_env(16)
+    for cell in [cell for cell, feature in env.grid.items() if feature == Feature.WUMPUS]:
+        del env.grid[cell]
+    shots = [(x, y, d) for x in range(1, 17) for y in (1, 8, 16) for d in range(4)]
+
+    def run():
+        for x, y, d in shots:
+            env.shoot(x, y, d)
+    return run, len(shots)
+
+
+@benchmark('chunked.walk')
+def bench_chunked_walk():
+    # A random walk over a 1,000,000 x 1,000,000 lazy cave: percepts, moves and chunk generation
+    rng = random.Random('bench')
+    moves = [rng.randrange(4) for _ in range(10_000)]
+
+    def run():
+        env = ChunkedWumpusEnvironment(1_000_000, seed='bench', max_chunks=16)
+        x = y = 500_000
+        for d in moves:
+            env.percept_bits(x, y)
+            x, y, _ = env.move(x, y, d)
+    return run, len(moves)
+
+
+@benchmark('chunked.shoot')
+def bench_chunked_shoot():
+    # Misses across a whole 1,000,000-room row, reading Wumpus placements of chunks it never loads
+    env = ChunkedWumpusEnvironment(1_000_000, seed='bench', generator=CaveGenerator(pit_density=0.2, wumpuses=0))
+
+    def run():
+        env.shoot(1, 1, 0)
+    return run, 1
+
+
+def bench_a_star(size: int):
+    agent = EnhancedAgent(size=size)
+
+    def run():
+        agent.a_star((1, 1), (size, size), allow_unknown=True)
+    return run, 1
+
+
+for _size in (4, 16):
+    benchmark(f'agent.a_star[{_size}]')(lambda size=_size: bench_a_star(size))
+
+
+@benchmark('agent.choose_action')
+def bench_choose_action():
+    calls = record_episode()
+
+    def run():
+        replay_agent(calls)
+    return run, len(calls)
+
+
+@benchmark('agent.update_beliefs')
+def bench_update_beliefs():
+    calls = record_episode(use_posteriors=True)
+    # Stop where the most breezes are known, so the frontier enumeration has real work to do
+    agent = max((replay_agent(calls[:n], use_posteriors=True) for n in range(1, len(calls) + 1)),
+                key=lambda agent: len(agent.breezy))
+    return agent.update_beliefs, 1
+
+
+def bench_episodes(size: int, count: int):
+    def run():
+        for index in range(count):
+            run_episode(episode_seed('bench', index), size=size)
+    return run, count
+
+
+for _size, _count in ((4, 20), (8, 10), (16, 4), (32, 2)):
+    benchmark(f'episode[{_size}]')(lambda size=_size, count=_count: bench_episodes(size, count))
+
+
+@benchmark('render.draw')
+def bench_draw():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from main import WumpusGame  # pygame is only needed here
+    game = WumpusGame(4, seed='bench')
+    game.agent.visited.add((1, 1))
+    game.redraw_all()
+    cells = [(1, 1), (2, 1)]
+
+    def run():
+        # One step east and back: two dirty frames
+        for cell in cells:
+            game.agent.x, game.agent.y = cell
+            game.agent.visited.add(cell)
+            game.draw()
+    return run, len(cells)
+
+
+def import_time(module: str = 'runner') -> float:
+    """Wall time for a fresh interpreter to start and import `module` from this directory."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', f"import {module}"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                   check=True)
+    return time.perf_counter() - start
+
+
+def forbidden_imports(module: str = 'runner') -> List[str]:
+    """Which HEADLESS_FORBIDDEN modules importing `module` loads."""
+    code = f"import sys, {module}; print(' '.join(m for m in {HEADLESS_FORBIDDEN!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         check=True, capture_output=True, text=True).stdout
+    return out.split()
+
+
+@benchmark('startup[runner]')
+def bench_startup():
+    return import_time, 1
+
+
+def check_startup(runs: int = 10, budget: float = STARTUP_BUDGET) -> bool:
+    best = min(import_time() for _ in range(runs))
+    baseline = min(import_time('sys') for _ in range(runs))
+    loaded = forbidden_imports()
+    print(f"import runner: {format_time(best)} (interpreter alone {format_time(baseline)}, budget {format_time(budget)})")
+    if loaded:
+        print(f"headless import loads {', '.join(loaded)}")
+    return best <= budget and not loaded
+
+
+def measure(fn: Callable, ops: int, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """Times fn like timeit: enough loops per repeat to last min_time, then the best and median of `repeat`."""
+    fn()  # warm up caches and lazy imports
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+    times = [elapsed]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        times.append(time.perf_counter() - start)
+    per_op = [t / (loops * ops) for t in times]
+    return {'best': min(per_op), 'median': median(per_op), 'loops': loops, 'ops': ops}
+
+
+def run_benchmarks(patterns: Optional[List[str]] = None, repeat: int = 5, min_time: float = 0.2,
+                   verbose: bool = True) -> dict:
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if patterns and not any(fnmatch.fnmatch(name, p) for p in patterns):
+            continue
+        fn, ops = setup()
+        results[name] = measure(fn, ops, repeat, min_time)
+        if verbose:
+            print(f"{name:<24} {format_time(results[name]['best'])}/op", file=sys.stderr)
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> List[dict]:
+    """
+    Compares best-of-repeat times per benchmark. A ratio above 1 + threshold is a regression,
+    below 1 - threshold an improvement.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = result['best'] / base['best']
+        status = 'regression' if ratio > 1 + threshold else 'improvement' if ratio < 1 - threshold else 'ok'
+        rows.append({'name': name, 'baseline': base['best'], 'current': result['best'], 'ratio': ratio,
+                     'status': status})
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the environment, agent and renderer hot paths.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="List the benchmarks")
+    startup = sub.add_parser('startup', help="Check the headless import against the startup budget")
+    startup.add_argument('--runs', type=int, default=10)
+    startup.add_argument('--budget', type=float, default=STARTUP_BUDGET, help="Seconds (default %(default)s)")
+    for name, help_text in (('run', "Run benchmarks and optionally save them as a baseline"),
+                            ('compare', "Run benchmarks (or load --current) and compare against a baseline")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument('-k', '--filter', action='append', metavar='PATTERN',
+                       help="Only run benchmarks matching this glob (repeatable)")
+        p.add_argument('--repeat', type=int, default=5)
+        p.add_argument('--min-time', type=float, default=0.2, help="Seconds per repeat")
+    run_parser, compare_parser = sub.choices['run'], sub.choices['compare']
+    run_parser.add_argument('--save', nargs='?', const=DEFAULT_BASELINE, default=None, metavar='FILE',
+                            help=f"Save the results as a baseline (default file: {DEFAULT_BASELINE})")
+    run_parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    compare_parser.add_argument('baseline', nargs='?', default=DEFAULT_BASELINE)
+    compare_parser.add_argument('--current', default=None, metavar='FILE', help="Compare this saved run instead")
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help="Relative slowdown that counts as a regression (default 0.10)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.command == 'list':
+        print('\n'.join(BENCHMARKS))
+        return 0
+    if args.command == 'startup':
+        return 0 if check_startup(args.runs, args.budget) else 1
+    if args.command == 'run':
+        results = run_benchmarks(args.filter, args.repeat, args.min_time)
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"Saved baseline to {args.save}", file=sys.stderr)
+        if args.json:
+            json.dump(results, sys.stdout, indent=2)
+            print()
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        patterns = args.filter or list(baseline['results'])
+        current = run_benchmarks(patterns, args.repeat, args.min_time)
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        print(f"{row['name']:<24} {format_time(row['baseline'])} -> {format_time(row['current'])}"
+              f"  x{row['ratio']:.2f}  {row['status']}")
+    regressions = [row['name'] for row in rows if row['status'] == 'regression']
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
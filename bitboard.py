@@ -0,0 +1,171 @@
+import re
+from collections.abc import MutableSet
+from functools import lru_cache
+from typing import Iterable, Iterator, Tuple
+
+Cell = Tuple[int, int]
+
+_NONZERO = re.compile(rb'[^\x00]')
+
+
+@lru_cache(maxsize=None)
+def board_mask(size: int) -> int:
+    """Int with one bit set per cell of a size x size board (guard column clear)."""
+    row = (1 << size) - 1
+    stride = size + 1
+    mask = 0
+    for y in range(size):
+        mask |= row << (y * stride)
+    return mask
+
+
+class BitBoard(MutableSet):
+    """
+    Set of (x, y) cells of a size x size cave, one bit per cell in a bytearray.
+    Cell (x, y) is bit (y - 1) * stride + (x - 1); each row carries one guard bit
+    (stride = size + 1) so whole boards can be shifted a cell in any direction without
+    wrapping. Membership and add/discard are O(1); set algebra and neighbours() run on
+    the board as one int, and iteration only visits non-zero bytes.
+    """
+    __slots__ = ('size', 'stride', 'bits', 'count')
+
+    def __init__(self, size: int, cells: Iterable[Cell] = ()):
+        self.size = size
+        self.stride = size + 1
+        self.bits = bytearray((self.stride * size + 7) // 8)
+        self.count = 0
+        for cell in cells:
+            self.add(cell)
+
+    @classmethod
+    def full(cls, size: int) -> 'BitBoard':
+        board = cls(size)
+        board.fill()
+        return board
+
+    def _index(self, cell: Cell) -> int:
+        x, y = cell
+        if 1 <= x <= self.size and 1 <= y <= self.size:
+            return (y - 1) * self.stride + (x - 1)
+        return -1
+
+    def __contains__(self, cell) -> bool:
+        # Hot path (agent neighbour checks): _index is inlined
+        x, y = cell
+        size = self.size
+        if 0 < x <= size and 0 < y <= size:
+            i = (y - 1) * self.stride + x - 1
+            return self.bits[i >> 3] >> (i & 7) & 1 == 1
+        return False
+
+    def add(self, cell: Cell):
+        i = self._index(cell)
+        if i < 0:
+            raise ValueError(f"{cell} is outside the {self.size}x{self.size} board")
+        byte = self.bits[i >> 3]
+        bit = 1 << (i & 7)
+        if not byte & bit:
+            self.bits[i >> 3] = byte | bit
+            self.count += 1
+
+    def discard(self, cell: Cell):
+        i = self._index(cell)
+        if i < 0:
+            return
+        byte = self.bits[i >> 3]
+        bit = 1 << (i & 7)
+        if byte & bit:
+            self.bits[i >> 3] = byte & ~bit
+            self.count -= 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Cell]:
+        bits = bytes(self.bits)
+        stride = self.stride
+        for m in _NONZERO.finditer(bits):
+            base = m.start() * 8
+            byte = bits[m.start()]
+            while byte:
+                low = byte & -byte
+                i = base + low.bit_length() - 1
+                byte ^= low
+                yield i % stride + 1, i // stride + 1
+
+    def __repr__(self) -> str:
+        return f"BitBoard({self.size}, {sorted(self)})"
+
+    # Whole-board operations on the int form
+
+    def to_int(self) -> int:
+        return int.from_bytes(self.bits, 'little')
+
+    def set_int(self, value: int):
+        self.bits[:] = value.to_bytes(len(self.bits), 'little')
+        self.count = value.bit_count()
+
+    def _new(self, value: int) -> 'BitBoard':
+        board = BitBoard(self.size)
+        board.set_int(value)
+        return board
+
+    def copy(self) -> 'BitBoard':
+        return self._new(self.to_int())
+
+    def fill(self):
+        self.set_int(board_mask(self.size))
+
+    def clear(self):
+        self.bits[:] = bytes(len(self.bits))
+        self.count = 0
+
+    def complement(self) -> 'BitBoard':
+        return self._new(board_mask(self.size) & ~self.to_int())
+
+    def neighbours(self) -> 'BitBoard':
+        """Cells orthogonally adjacent to any cell of this board."""
+        b = self.to_int()
+        s = self.stride
+        return self._new(((b << 1) | (b >> 1) | (b << s) | (b >> s)) & board_mask(self.size))
+
+    def __and__(self, other):
+        if isinstance(other, BitBoard):
+            return self._new(self.to_int() & other.to_int())
+        return super().__and__(other)
+
+    def __or__(self, other):
+        if isinstance(other, BitBoard):
+            return self._new(self.to_int() | other.to_int())
+        return super().__or__(other)
+
+    def __sub__(self, other):
+        if isinstance(other, BitBoard):
+            return self._new(self.to_int() & ~other.to_int())
+        return super().__sub__(other)
+
+    def __xor__(self, other):
+        if isinstance(other, BitBoard):
+            return self._new(self.to_int() ^ other.to_int())
+        return super().__xor__(other)
+
+    def __ior__(self, other):
+        if isinstance(other, BitBoard):
+            self.set_int(self.to_int() | other.to_int())
+            return self
+        return super().__ior__(other)
+
+    def __iand__(self, other):
+        if isinstance(other, BitBoard):
+            self.set_int(self.to_int() & other.to_int())
+            return self
+        return super().__iand__(other)
+
+    def __isub__(self, other):
+        if isinstance(other, BitBoard):
+            self.set_int(self.to_int() & ~other.to_int())
+            return self
+        return super().__isub__(other)
+
+    def _from_iterable(self, cells):
+        return BitBoard(self.size, cells)
@@ -0,0 +1,182 @@
+import random
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from environment import EMPTY, WUMPUS, PIT, GOLD, WALL, CODE_FEATURES
+from generator import CaveGenerator
+from models import Feature, Pos, Percept, PERCEPTS, BREEZE, STENCH, GLITTER
+
+Chunk = Tuple[int, int]
+
+# AIDEV-NOTE: a chunk is exactly generator.cave(chunk, random.Random(f"{seed}:{cx}:{cy}"), start), with
+# start true only for chunk (0, 0), so the global (1, 1) is the one room kept clear of hazards; and
+# shoot() finds Wumpuses in chunks it does not load through generator.placements() on the same RNG.
+# Both rely on CaveGenerator drawing placements first and never redrawing (solvable=None); any
+# change to the world since generation must go through `edits`, or eviction silently undoes it.
+
+
+class ChunkGridView:
+    """The {(x, y): Feature} lookups WumpusEnvironment.grid offers that make sense for a lazy cave."""
+
+    def __init__(self, env: 'ChunkedWumpusEnvironment'):
+        self.env = env
+
+    def get(self, key, default=None) -> Optional[Feature]:
+        code = self.env.code(*key)
+        return CODE_FEATURES[code] if code not in (EMPTY, WALL) else default
+
+    def __getitem__(self, key) -> Feature:
+        feature = self.get(key)
+        if feature is None:
+            raise KeyError(key)
+        return feature
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+
+class ChunkedWumpusEnvironment:
+    """
+    A size x size cave too big to hold, cut into chunk x chunk tiles that are generated on first
+    access from (seed, chunk coordinate) by `generator` (default: the classic 3 pits in 15 rooms as
+    a density, one Wumpus and one gold per chunk; only the cave's own (1, 1) is kept clear). At most `max_chunks` tiles stay resident, least
+    recently used evicted first, so memory follows the area being explored rather than the cave.
+    Rooms of edge chunks beyond `size` are cut off. Serves the WumpusEnvironment calls agents and
+    runners make: percept / percept_bits / get_perception, is_terminal, move, shoot and grid.get.
+    """
+
+    def __init__(self, size: int, seed=0, chunk: int = 64, max_chunks: int = 256,
+                 generator: Optional[CaveGenerator] = None):
+        generator = generator if generator is not None else CaveGenerator(pit_density=0.2)
+        if generator.solvable is not None:
+            raise ValueError("chunks are generated independently; solvable caves need a whole-cave generator")
+        self.size = size
+        self.seed = seed
+        self.chunk = chunk
+        self.max_chunks = max_chunks
+        self.generator = generator
+        self.chunks: 'OrderedDict[Chunk, bytearray]' = OrderedDict()
+        # Cells changed since generation (killed Wumpuses), reapplied whenever a chunk is regenerated
+        self.edits: Dict[Chunk, Dict[int, int]] = {}
+        self.generated = 0
+        self.evicted = 0
+
+    def chunk_rng(self, key: Chunk) -> random.Random:
+        return random.Random(f"{self.seed}:{key[0]}:{key[1]}")
+
+    @staticmethod
+    def holds_start(key: Chunk) -> bool:
+        return key == (0, 0)
+
+    def load_chunk(self, key: Chunk) -> bytearray:
+        """The chunk's cell codes (row-major, like cave_bytes), generating it if it is not resident."""
+        cells = self.chunks.get(key)
+        if cells is not None:
+            self.chunks.move_to_end(key)
+            return cells
+        cells = bytearray(self.generator.cave(self.chunk, self.chunk_rng(key), self.holds_start(key)))
+        for i, code in self.edits.get(key, {}).items():
+            cells[i] = code
+        self.generated += 1
+        self.chunks[key] = cells
+        if len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+            self.evicted += 1
+        return cells
+
+    def locate(self, x: int, y: int) -> Tuple[Chunk, int]:
+        """(chunk coordinate, index within the chunk) of room (x, y)."""
+        cy, ry = divmod(y - 1, self.chunk)
+        cx, rx = divmod(x - 1, self.chunk)
+        return (cx, cy), ry * self.chunk + rx
+
+    def code(self, x: int, y: int) -> int:
+        """Cell code of (x, y); WALL outside the cave."""
+        if not (1 <= x <= self.size and 1 <= y <= self.size):
+            return WALL
+        key, i = self.locate(x, y)
+        return self.load_chunk(key)[i]
+
+    def set_code(self, x: int, y: int, code: int):
+        key, i = self.locate(x, y)
+        self.edits.setdefault(key, {})[i] = code
+        if key in self.chunks:
+            self.chunks[key][i] = code
+
+    @property
+    def grid(self) -> ChunkGridView:
+        return ChunkGridView(self)
+
+    def percept_bits(self, x: int, y: int) -> int:
+        c = self.chunk
+        key, i = self.locate(x, y)
+        cells = self.load_chunk(key)
+        rx, ry = i % c, i // c
+        if 0 < rx < c - 1 and 0 < ry < c - 1 and x < self.size and y < self.size:
+            # Inside the chunk and the cave: neighbours are +-1 / +-chunk, as in WumpusEnvironment's flat grid
+            around = (cells[i + 1], cells[i - 1], cells[i + c], cells[i - c])
+        else:
+            around = (self.code(x + 1, y), self.code(x - 1, y), self.code(x, y + 1), self.code(x, y - 1))
+        bits = GLITTER if cells[i] == GOLD else 0
+        for code in around:
+            if code == WUMPUS:
+                bits |= STENCH
+            elif code == PIT:
+                bits |= BREEZE
+        return bits
+
+    def percept(self, x: int, y: int) -> Percept:
+        return PERCEPTS[self.percept_bits(x, y)]
+
+    def get_perception(self, pos) -> Percept:
+        """Percept at a Position or Pos."""
+        return PERCEPTS[self.percept_bits(pos.x, pos.y)]
+
+    def is_terminal(self, pos: Pos) -> bool:
+        return self.code(pos.x, pos.y) in (WUMPUS, PIT)
+
+    def move(self, x, y, direction):
+        # direction: 0=EAST, 1=NORTH, 2=WEST, 3=SOUTH
+        dx, dy = [(1, 0), (0, 1), (-1, 0), (0, -1)][direction]
+        nx, ny = x + dx, y + dy
+        bump = not (1 <= nx <= self.size and 1 <= ny <= self.size)
+        if bump:
+            nx, ny = x, y
+        return nx, ny, bump
+
+    def wumpuses(self, key: Chunk) -> List[int]:
+        """Indices of the Wumpuses in a chunk, without generating it if it is not resident."""
+        cells = self.chunks.get(key)
+        if cells is not None:
+            return [i for i, code in enumerate(cells) if code == WUMPUS]
+        edits = self.edits.get(key, {})
+        placed = self.generator.placements(self.chunk, self.chunk_rng(key),
+                                           self.holds_start(key))[:self.generator.wumpuses]
+        return ([i for i in placed if edits.get(i, WUMPUS) == WUMPUS]
+                + [i for i, code in edits.items() if code == WUMPUS and i not in placed])
+
+    def shoot(self, x, y, direction):
+        # direction: 0=EAST, 1=NORTH, 2=WEST, 3=SOUTH
+        dx, dy = [(1, 0), (0, 1), (-1, 0), (0, -1)][direction.value if hasattr(direction, 'value') else direction]
+        c = self.chunk
+        # Chunk by chunk along the arrow's line: the nearest Wumpus on it, if any, beyond (x, y)
+        key, i = self.locate(x, y)
+        along, across = (i % c, i // c) if dx else (i // c, i % c)
+        step = dx or dy
+        while 0 <= key[0] and 0 <= key[1] and key[0] * c < self.size and key[1] * c < self.size:
+            base = (key[0] if dx else key[1]) * c  # rooms before this chunk along the line
+            hits = []
+            for w in self.wumpuses(key):
+                w_along, w_across = (w % c, w // c) if dx else (w // c, w % c)
+                if w_across == across and (w_along - along) * step > 0 and base + w_along < self.size:
+                    hits.append(w_along)
+            if hits:
+                room = base + (min(hits) if step > 0 else max(hits)) + 1
+                self.set_code(*((room, y) if dx else (x, room)), EMPTY)
+                return True  # Scream
+            key = (key[0] + dx, key[1] + dy)
+            along = -1 if step > 0 else c
+        return False
+
+    def resident_bytes(self) -> int:
+        return len(self.chunks) * self.chunk * self.chunk
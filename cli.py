@@ -0,0 +1,40 @@
+import importlib
+import sys
+
+# AIDEV-NOTE: subcommand modules are imported only once chosen, so `run` never loads pygame and
+# `play` never loads the batch runner. Keep this module's own imports to the standard library.
+COMMANDS = {
+    'play': ('main', "Watch the agent explore a cave (pygame)"),
+    'run': ('runner', "Run episodes headlessly in parallel"),
+    'bench': ('bench', "Benchmark hot paths and compare against a baseline"),
+    'corpus': ('corpus', "Generate or inspect a memory-mapped cave corpus"),
+    'tune': ('tune', "Tune agent settings by successive halving"),
+    'oracle': ('oracle', "Best achievable score for every cave of a corpus"),
+    'serve': ('server', "Serve caves to remote agents over newline-delimited JSON"),
+    'loadtest': ('loadtest', "Load-test the game server"),
+}
+
+
+def usage() -> str:
+    lines = ["usage: wumpus-cave {play,run,bench,corpus,tune,oracle,serve,loadtest} [options]", "", "commands:"]
+    lines += [f"  {name:<10}{help_text}" for name, (_, help_text) in COMMANDS.items()]
+    lines.append("\nRun 'wumpus-cave COMMAND --help' for a command's options.")
+    return '\n'.join(lines)
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0 if argv else 2
+    if argv[0] not in COMMANDS:
+        print(f"wumpus-cave: unknown command {argv[0]!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+    # argparse names the program after argv[0]; make --help read "wumpus-cave run ..."
+    sys.argv[0] = f"wumpus-cave {argv[0]}"
+    module = importlib.import_module(COMMANDS[argv[0]][0])
+    return module.main(argv[1:]) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
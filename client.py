@@ -0,0 +1,116 @@
+import asyncio
+import json
+from itertools import count
+from typing import Dict, List, Optional
+
+from server import DEFAULT_HOST, DEFAULT_PORT, HIGH_WATER, ServerError
+
+
+class GameClient:
+    """
+    Async client for server.py. send() pipelines: it writes the request and returns a future
+    at once, so many requests can be in flight on one connection; a reader task matches
+    responses to futures by id.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.ids = count(1)
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.reader_task = asyncio.get_running_loop().create_task(self._read())
+
+    @classmethod
+    async def connect(cls, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                      path: Optional[str] = None) -> 'GameClient':
+        """Connects to a Unix socket at `path`, else to TCP host:port."""
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path, limit=HIGH_WATER)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=HIGH_WATER)
+        return cls(reader, writer)
+
+    async def _read(self):
+        error: Exception = ConnectionError("connection closed")
+        try:
+            while line := await self.reader.readline():
+                response = json.loads(line)
+                future = self.pending.pop(response.pop('id', None), None)
+                if future is None or future.done():
+                    continue
+                if 'error' in response:
+                    future.set_exception(ServerError(response['error']))
+                else:
+                    future.set_result(response)
+        except (ConnectionError, ValueError) as e:
+            error = e
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.pending.clear()
+
+    def send(self, op: str, **fields) -> asyncio.Future:
+        """Writes one request without waiting; the future resolves to its response or ServerError."""
+        rid = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[rid] = future
+        self.writer.write(json.dumps({'id': rid, 'op': op, **fields}, separators=(',', ':')).encode() + b'\n')
+        return future
+
+    async def request(self, op: str, **fields) -> dict:
+        future = self.send(op, **fields)
+        if self.writer.transport.get_write_buffer_size() > HIGH_WATER:
+            await self.writer.drain()
+        return await future
+
+    async def new_session(self, size: int = 4, seed=None, cave: Optional[bytes] = None,
+                          max_steps: int = 1000) -> dict:
+        """Starts a session; the response holds its "session" id and the starting state."""
+        fields = {'size': size, 'max_steps': max_steps}
+        if seed is not None:
+            fields['seed'] = seed
+        if cave is not None:
+            fields['cave'] = bytes(cave).hex()
+        return await self.request('new', **fields)
+
+    async def percept(self, session: int) -> dict:
+        return await self.request('percept', session=session)
+
+    async def move(self, session: int, direction: int) -> dict:
+        """direction: 0=EAST, 1=NORTH, 2=WEST, 3=SOUTH, as WumpusEnvironment.move."""
+        return await self.request('move', session=session, dir=direction)
+
+    async def shoot(self, session: int, direction: Optional[int] = None) -> dict:
+        if direction is None:
+            return await self.request('shoot', session=session)
+        return await self.request('shoot', session=session, dir=direction)
+
+    async def act(self, session: int, action: str) -> dict:
+        """One EnhancedAgent action name, e.g. "MOVE_NORTH" or "GRAB"."""
+        return await self.request('act', session=session, action=action)
+
+    async def step(self, session: int, actions: List[str]) -> List[dict]:
+        """Plays several actions in one round trip; the states stop where the episode ended."""
+        return (await self.request('step', session=session, actions=actions))['states']
+
+    async def batch(self, requests: List[dict]) -> List[dict]:
+        """Several requests, e.g. one per session, in one message; error responses are returned, not raised."""
+        return (await self.request('batch', requests=requests))['responses']
+
+    async def close_session(self, session: int) -> dict:
+        return await self.request('close', session=session)
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self.reader_task
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,131 @@
+import mmap
+import os
+import struct
+import sys
+from typing import Iterator, Optional
+
+from environment import WumpusEnvironment
+from generator import add_generator_arguments, generator_from_args
+
+# AIDEV-NOTE: on-disk layout - HEADER, then `count` caves of size * size cell codes each, in
+# WumpusEnvironment.cave_bytes() order. Bump MAGIC if either changes.
+MAGIC = b'WCV1'
+HEADER = struct.Struct('<4sHHQ')  # MAGIC, cave size, reserved, cave count
+
+
+def episode_seed(seed: int, index: int) -> str:
+    # String seeds are hashed with SHA-512 by `random`, so (seed, index) pairs never collide
+    # and an episode's cave does not depend on which worker or chunk ran it.
+    return f"{seed}:{index}"
+
+
+class CaveCorpus:
+    """
+    Read-only memory map of a corpus file. Every process that opens the same file shares the
+    page cache, so pool workers read caves without copying or regenerating them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size, _, self.count = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a cave corpus")
+        self.cells = self.size * self.size
+        if len(self.map) < HEADER.size + self.count * self.cells:
+            raise ValueError(f"{path} is truncated")
+        self.view = memoryview(self.map)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def cave(self, i: int) -> memoryview:
+        """Cave i's cell codes, as a zero-copy slice of the map."""
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        start = HEADER.size + i * self.cells
+        return self.view[start:start + self.cells]
+
+    def environment(self, i: int) -> WumpusEnvironment:
+        return WumpusEnvironment(self.size, cave=self.cave(i))
+
+    def __iter__(self) -> Iterator[memoryview]:
+        for i in range(self.count):
+            yield self.cave(i)
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _generate_chunk(args):
+    path, start, count, size, seed, generator = args
+    cells = size * size
+    with open(path, 'r+b') as f, mmap.mmap(f.fileno(), 0) as out:
+        offset = HEADER.size + start * cells
+        for index in range(start, start + count):
+            env = WumpusEnvironment(size, seed=episode_seed(seed, index), generator=generator)
+            out[offset:offset + cells] = env.cave_bytes()
+            offset += cells
+    return count
+
+
+def generate_corpus(path: str, count: int, size: int = 4, seed: int = 0, workers: Optional[int] = None,
+                    chunk_size: int = 10_000, generator=None):
+    """
+    Writes `count` caves to `path`. Cave i is the one runner.run_episode plays for episode i of `seed`,
+    so corpus-backed and generated batches score identical caves. Workers fill disjoint slices of
+    the pre-sized file in place. Pass the run's `generator` (a generator.CaveGenerator) too, if any.
+    """
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, size, 0, count))
+        f.truncate(HEADER.size + count * size * size)
+    tasks = [(path, start, min(chunk_size, count - start), size, seed, generator)
+             for start in range(0, count, chunk_size)]
+    workers = workers or os.process_cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        for task in tasks:
+            _generate_chunk(task)
+        return
+    from multiprocessing import Pool
+    with Pool(processes=workers) as pool:
+        for _ in pool.imap_unordered(_generate_chunk, tasks):
+            pass
+
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate or inspect a memory-mapped cave corpus.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    generate = sub.add_parser('generate', help="Generate a corpus file")
+    generate.add_argument('path')
+    generate.add_argument('-n', '--caves', type=int, default=1_000_000)
+    generate.add_argument('-s', '--seed', type=int, default=0)
+    generate.add_argument('--size', type=int, default=4, help="Cave width and height")
+    generate.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    add_generator_arguments(generate)
+    info = sub.add_parser('info', help="Describe a corpus file")
+    info.add_argument('path')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'generate':
+        generate_corpus(args.path, args.caves, args.size, args.seed, args.workers,
+                        generator=generator_from_args(args))
+    with CaveCorpus(args.path) as corpus:
+        print(f"{corpus.path}: {len(corpus)} caves of {corpus.size}x{corpus.size} "
+              f"({HEADER.size + len(corpus) * corpus.cells} bytes)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,45 +1,177 @@
 import random
-from models import Position, Feature, Direction, Perception
-from typing import Dict, Tuple
+import re
+from collections.abc import MutableMapping
+from models import Pos, Feature, Direction, Percept, PERCEPTS, BREEZE, STENCH, GLITTER
+from typing import Dict, Iterator, Optional, Tuple
+
+# Cell codes of WumpusEnvironment.cells; WALL marks the padding ring around the cave
+EMPTY, WUMPUS, PIT, GOLD, WALL = 0, 1, 2, 3, 255
+FEATURE_CODES = {Feature.EMPTY: EMPTY, Feature.WUMPUS: WUMPUS, Feature.PIT: PIT, Feature.GOLD: GOLD}
+CODE_FEATURES = {code: feature for feature, code in FEATURE_CODES.items()}
+_FEATURE_CELLS = re.compile(rb'[\x01-\x03]')
+
+# AIDEV-NOTE: get_perception/percept hand out shared, immutable models.Percept masks; call
+# to_perception() on them only where a pydantic Perception is really needed.
+
+
+class GridView(MutableMapping):
+    """Dict-style {(x, y): Feature} view over the flat cell array, holding only non-empty cells."""
+
+    def __init__(self, env: 'WumpusEnvironment'):
+        self.env = env
+
+    def _index(self, key) -> int:
+        x, y = key
+        if not (1 <= x <= self.env.size and 1 <= y <= self.env.size):
+            raise KeyError(key)
+        return self.env.index(x, y)
+
+    def __getitem__(self, key) -> Feature:
+        code = self.env.cells[self._index(key)]
+        if code == EMPTY:
+            raise KeyError(key)
+        return CODE_FEATURES[code]
+
+    def get(self, key, default=None):
+        x, y = key
+        if 1 <= x <= self.env.size and 1 <= y <= self.env.size:
+            code = self.env.cells[self.env.index(x, y)]
+            if code != EMPTY:
+                return CODE_FEATURES[code]
+        return default
+
+    def __setitem__(self, key, feature: Feature):
+        self.env.set_cell(self._index(key), FEATURE_CODES[feature])
+
+    def __delitem__(self, key):
+        i = self._index(key)
+        if self.env.cells[i] == EMPTY:
+            raise KeyError(key)
+        self.env.set_cell(i, EMPTY)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        stride = self.env.stride
+        for m in _FEATURE_CELLS.finditer(self.env.cells):
+            yield m.start() % stride, m.start() // stride
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
 
 class WumpusEnvironment:
-    def __init__(self, size: int = 4):
+    def __init__(self, size: int = 4, seed=None, rng: Optional[random.Random] = None, cave=None, generator=None):
+        """
+        Caves come from `rng`, else from a random.Random(seed), else from the global `random` module.
+        random.Random(seed) places features exactly like random.seed(seed) followed by the global RNG.
+        `cave` (size * size cell codes, see cave_bytes) loads a stored cave instead of generating one.
+        `generator` (a generator.CaveGenerator) draws the cave from the same RNG in place of init_grid.
+        """
         self.size = size
-        self.grid: Dict[Tuple[int, int], Feature] = {}
-        self.init_grid()
+        self.rng = rng if rng is not None else random.Random(seed) if seed is not None else random
+        # Row-major flat grid with a one-cell WALL ring: cell (x, y) lives at y * stride + x,
+        # so neighbours are +-1 / +-stride without bounds checks.
+        self.stride = size + 2
+        self.cells = bytearray(self.stride * self.stride)
+        # Percept bits (BREEZE | STENCH | GLITTER) per cell, kept in sync with `cells`
+        self.percepts = bytearray(self.stride * self.stride)
+        if cave is None and generator is not None:
+            cave = generator.cave(size, self.rng)
+        if cave is not None:
+            self.load_cave(cave)
+        else:
+            self.init_grid()
+
+    @property
+    def grid(self) -> GridView:
+        return GridView(self)
+
+    @grid.setter
+    def grid(self, grid: Dict[Tuple[int, int], Feature]):
+        self.reset_cells()
+        for (x, y), feature in grid.items():
+            self.cells[self.index(x, y)] = FEATURE_CODES[feature]
+        self.build_percepts()
+
+    def index(self, x: int, y: int) -> int:
+        return y * self.stride + x
+
+    def reset_cells(self):
+        n = self.stride
+        self.cells[:] = bytes(n * n)
+        self.cells[:n] = self.cells[-n:] = bytes([WALL]) * n
+        for y in range(1, n - 1):
+            self.cells[y * n] = self.cells[y * n + n - 1] = WALL
 
     def init_grid(self):
+        self.reset_cells()
         positions = [(x, y) for x in range(1, self.size + 1)
                      for y in range(1, self.size + 1) if (x, y) != (1, 1)]
-        random.shuffle(positions)
+        self.rng.shuffle(positions)
         # Place Wumpus
         x, y = positions.pop()
-        self.grid[(x, y)] = Feature.WUMPUS
+        self.cells[self.index(x, y)] = WUMPUS
         # Place Gold
         x, y = positions.pop()
-        self.grid[(x, y)] = Feature.GOLD
+        self.cells[self.index(x, y)] = GOLD
         # Place 3 Pits
         for _ in range(3):
             x, y = positions.pop()
-            self.grid[(x, y)] = Feature.PIT
-
-    def get_perception(self, pos: Position) -> Perception:
-        p = Perception()
-        x, y = pos.x, pos.y
-        adjacent = [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]
-        for ax, ay in adjacent:
-            if (ax, ay) in self.grid:
-                if self.grid[(ax, ay)] == Feature.WUMPUS:
-                    p.stench = True
-                elif self.grid[(ax, ay)] == Feature.PIT:
-                    p.breeze = True
-        if (x, y) in self.grid and self.grid[(x, y)] == Feature.GOLD:
-            p.glitter = True
-        return p
-
-    def is_terminal(self, pos: Position) -> bool:
-        if (pos.x, pos.y) in self.grid:
-            return self.grid[(pos.x, pos.y)] in [Feature.WUMPUS, Feature.PIT]
+            self.cells[self.index(x, y)] = PIT
+        self.build_percepts()
+
+    def cave_bytes(self) -> bytes:
+        """The cave without its WALL ring: one cell code per room, row y=1 first, x ascending."""
+        return b''.join(self.cells[self.index(1, y):self.index(1, y) + self.size] for y in range(1, self.size + 1))
+
+    def load_cave(self, cave):
+        """Loads cell codes laid out like cave_bytes() (any bytes-like object, e.g. a corpus memoryview)."""
+        if len(cave) != self.size * self.size:
+            raise ValueError(f"a {self.size}x{self.size} cave has {self.size * self.size} cells, got {len(cave)}")
+        self.reset_cells()
+        for y in range(1, self.size + 1):
+            row = (y - 1) * self.size
+            self.cells[self.index(1, y):self.index(1, y) + self.size] = cave[row:row + self.size]
+        self.build_percepts()
+
+    def compute_percept(self, i: int) -> int:
+        cells = self.cells
+        bits = GLITTER if cells[i] == GOLD else 0
+        for j in (i + 1, i - 1, i + self.stride, i - self.stride):
+            if cells[j] == WUMPUS:
+                bits |= STENCH
+            elif cells[j] == PIT:
+                bits |= BREEZE
+        return bits
+
+    def build_percepts(self):
+        # Only cells next to a feature perceive anything, so seed from the (few) feature cells
+        self.percepts[:] = bytes(len(self.cells))
+        for m in _FEATURE_CELLS.finditer(self.cells):
+            i = m.start()
+            for j in (i, i + 1, i - 1, i + self.stride, i - self.stride):
+                if self.cells[j] != WALL:
+                    self.percepts[j] = self.compute_percept(j)
+
+    def set_cell(self, i: int, code: int):
+        """Changes one cell and patches the percepts of it and its neighbours."""
+        self.cells[i] = code
+        for j in (i, i + 1, i - 1, i + self.stride, i - self.stride):
+            if self.cells[j] != WALL:
+                self.percepts[j] = self.compute_percept(j)
+
+    def percept_bits(self, x: int, y: int) -> int:
+        return self.percepts[y * self.stride + x]
+
+    def percept(self, x: int, y: int) -> Percept:
+        return PERCEPTS[self.percepts[y * self.stride + x]]
+
+    def get_perception(self, pos) -> Percept:
+        """Percept at a Position or Pos."""
+        return PERCEPTS[self.percepts[pos.y * self.stride + pos.x]]
+
+    def is_terminal(self, pos: Pos) -> bool:
+        if 1 <= pos.x <= self.size and 1 <= pos.y <= self.size:
+            return self.cells[self.index(pos.x, pos.y)] in (WUMPUS, PIT)
         return False
 
     def move(self, x, y, direction):
@@ -54,12 +186,13 @@ class WumpusEnvironment:
     def shoot(self, x, y, direction):
         # direction: 0=EAST, 1=NORTH, 2=WEST, 3=SOUTH
         dx, dy = [(1, 0), (0, 1), (-1, 0), (0, -1)][direction.value if hasattr(direction, 'value') else direction]
-        tx, ty = x + dx, y + dy
-        while 1 <= tx <= self.size and 1 <= ty <= self.size:
-            if (tx, ty) in self.grid and self.grid[(tx, ty)].name == 'WUMPUS':
+        step = dy * self.stride + dx
+        i = self.index(x, y) + step
+        cells = self.cells
+        while cells[i] != WALL:
+            if cells[i] == WUMPUS:
                 # Remove the Wumpus from the grid
-                del self.grid[(tx, ty)]
+                self.set_cell(i, EMPTY)
                 return True  # Scream
-            tx += dx
-            ty += dy
+            i += step
         return False
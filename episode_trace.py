@@ -0,0 +1,165 @@
+import mmap
+import os
+import struct
+import weakref
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from environment import CODE_FEATURES
+from knowledge_log import ACTIONS, ACTION_CODES
+from models import Feature
+
+# AIDEV-NOTE: on-disk layout - bump MAGIC if any struct below changes.
+#   MAGIC | episode* | index (uint64 offset per episode) | FOOTER
+#   episode = EPISODE header | FEATURE * features | STEP * steps
+MAGIC = b'WTR1'
+FOOTER = struct.Struct('<QQ4s')  # episode count, index offset, MAGIC
+EPISODE = struct.Struct('<HHIiB')  # cave size, features, steps, final score, outcome code
+FEATURE = struct.Struct('<HHB')  # x, y, environment cell code
+STEP = struct.Struct('<HHBBh')  # x, y after the action, action code, percept bits (models.BREEZE..SCREAM), score delta
+OUTCOMES = ['timeout', 'escaped', 'climbed', 'pit', 'wumpus']
+OUTCOME_CODES = {outcome: code for code, outcome in enumerate(OUTCOMES)}
+
+
+class EpisodeRecorder:
+    """Packs one episode in memory: the cave layout up front, then one STEP record per action."""
+
+    def __init__(self, env):
+        self.size = env.size
+        self.features = [(x, y, env.cells[env.index(x, y)]) for x, y in env.grid]
+        self.steps = bytearray()
+        self.count = 0
+
+    def record(self, x: int, y: int, action: str, bits: int, delta: int):
+        self.steps += STEP.pack(x, y, ACTION_CODES[action], bits, delta)
+        self.count += 1
+
+    def finish(self, score: int, outcome: str) -> bytes:
+        parts = [EPISODE.pack(self.size, len(self.features), self.count, score, OUTCOME_CODES[outcome])]
+        parts.extend(FEATURE.pack(*feature) for feature in self.features)
+        parts.append(self.steps)
+        return b''.join(parts)
+
+
+class TraceWriter:
+    """Appends packed episodes to a trace file and writes the offset index when closed."""
+
+    def __init__(self, path: str, buffer_size: int = 1 << 20):
+        self.path = path
+        self.file = open(path, 'wb', buffering=buffer_size)
+        self.file.write(MAGIC)
+        self.offsets = array('Q')
+        self.position = len(MAGIC)
+
+    def write_episode(self, blob: bytes):
+        self.offsets.append(self.position)
+        self.file.write(blob)
+        self.position += len(blob)
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.write(self.offsets.tobytes())
+        self.file.write(FOOTER.pack(len(self.offsets), self.position, MAGIC))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Episode:
+    """Zero-copy view of one stored episode, valid until its TraceReader is closed."""
+    __slots__ = ('size', 'score', 'outcome', 'features', 'steps', 'blob', '__weakref__')
+
+    def __init__(self, blob: memoryview):
+        size, n_features, n_steps, self.score, outcome = EPISODE.unpack_from(blob)
+        self.size = size
+        self.outcome = OUTCOMES[outcome]
+        start = EPISODE.size
+        self.features: List[Tuple[int, int, int]] = list(
+            FEATURE.iter_unpack(blob[start:start + FEATURE.size * n_features]))
+        start += FEATURE.size * n_features
+        self.steps = blob[start:start + STEP.size * n_steps]
+        self.blob = blob[:start + STEP.size * n_steps]
+
+    def __len__(self) -> int:
+        return len(self.steps) // STEP.size
+
+    def step(self, i: int) -> Tuple[int, int, Optional[str], int, int]:
+        """(x, y, action, percept bits, score delta) of step i."""
+        x, y, action, bits, delta = STEP.unpack_from(self.steps, i * STEP.size)
+        return x, y, ACTIONS[action], bits, delta
+
+    def iter_steps(self) -> Iterator[Tuple[int, int, Optional[str], int, int]]:
+        for x, y, action, bits, delta in STEP.iter_unpack(self.steps):
+            yield x, y, ACTIONS[action], bits, delta
+
+    def grid(self) -> Dict[Tuple[int, int], Feature]:
+        """The cave in the WumpusEnvironment.grid format."""
+        return {(x, y): CODE_FEATURES[code] for x, y, code in self.features}
+
+    def release(self):
+        """Drops the views into the trace file; the episode is unusable afterwards."""
+        self.steps.release()
+        self.blob.release()
+
+
+class TraceReader:
+    """Memory-mapped trace file with O(1) random access to any episode."""
+
+    def __init__(self, path: str):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        if self.view[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an episode trace")
+        count, index_offset, magic = FOOTER.unpack_from(self.view, len(self.view) - FOOTER.size)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is incomplete (was the writer closed?)")
+        self.index_offset = index_offset
+        self.offsets = self.view[index_offset:index_offset + 8 * count].cast('Q')
+        # Episodes still alive hold views of the map, which must be released before it can close
+        self.episodes = weakref.WeakSet()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, i: int) -> Episode:
+        if i < 0:
+            i += len(self)
+        end = self.offsets[i + 1] if i + 1 < len(self) else self.index_offset
+        episode = Episode(self.view[self.offsets[i]:end])
+        self.episodes.add(episode)
+        return episode
+
+    def __iter__(self) -> Iterator[Episode]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        for episode in list(self.episodes):
+            episode.release()
+        self.offsets.release()
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def merge_traces(path: str, parts: List[str]):
+    """Concatenates trace files, in order, into one trace at `path` and removes the parts."""
+    with TraceWriter(path) as writer:
+        for part in parts:
+            with TraceReader(part) as reader:
+                for episode in reader:
+                    writer.write_episode(episode.blob)
+                    episode.release()
+            os.remove(part)
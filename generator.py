@@ -0,0 +1,180 @@
+import random
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from bitboard import board_mask
+from environment import EMPTY, WUMPUS, PIT, GOLD
+
+# Cell code -> ASCII '1' for rooms an agent can walk through, '0' for pits and Wumpuses
+_OPEN_BITS = bytes(ord('1') if code in (EMPTY, GOLD) else ord('0') for code in range(256))
+SOLVABLE_MODES = ('reject', 'repair')
+
+
+def open_rooms(size: int, cave) -> int:
+    """Rooms free of pits and Wumpuses, as an int in bitboard.BitBoard's bit layout."""
+    rows = b''.join(bytes(cave[r * size:(r + 1) * size]).translate(_OPEN_BITS) + b'0' for r in range(size))
+    return int(rows[::-1], 2)
+
+
+def flood(size: int, open_bits: int) -> int:
+    """
+    Rooms reachable from (1, 1) through open_bits, growing every reached room at once per iteration.
+    Adding `reached` to open_bits also carries each reached bit east along its whole run of open
+    rooms (the row's guard bit stops it), so eastward corridors fill in a single iteration.
+    """
+    stride = size + 1
+    reached = open_bits & 1
+    while True:
+        east = (open_bits + reached) ^ open_bits
+        grown = (reached | east | reached >> 1 | reached << stride | reached >> stride) & open_bits
+        if grown == reached:
+            return reached
+        reached = grown
+
+
+_BOUNDARY_CODE = 254
+_BOUNDARY = re.compile(bytes([_BOUNDARY_CODE]))
+
+
+@lru_cache(maxsize=None)
+def _pit_table(floor: int) -> bytes:
+    """Random byte -> PIT below floor, a boundary marker at floor, EMPTY above."""
+    return bytes(PIT if b < floor else _BOUNDARY_CODE if b == floor else EMPTY for b in range(256))
+
+
+def _random_bit(bits: int, width: int, rng) -> int:
+    """A uniformly chosen set bit of `bits` (all below `width`): guesses first, then lists them."""
+    for _ in range(64):
+        b = rng.randrange(width)
+        if bits >> b & 1:
+            return b
+    return rng.choice([m.start() for m in re.finditer('1', bin(bits)[:1:-1])])
+
+
+class CaveGenerator:
+    """
+    Caves with `wumpuses` Wumpuses, `golds` piles of gold and either exactly `pits` pits or, with
+    `pit_density`, each other room a pit with that probability. Features go to distinct rooms
+    other than (1, 1) (with start=False, any room), drawn with random.sample over the room indices, so nothing is shuffled
+    or listed per room; density pits come from random bytes translated in one pass.
+    With `solvable`, every gold must be reachable from (1, 1) without entering a pit or a Wumpus:
+    'reject' draws again, 'repair' moves unreachable gold to a random reachable empty room.
+    """
+
+    def __init__(self, pits: int = 3, pit_density: Optional[float] = None, wumpuses: int = 1, golds: int = 1,
+                 solvable: Optional[str] = None, max_tries: int = 1000):
+        if solvable not in (None, *SOLVABLE_MODES):
+            raise ValueError(f"solvable must be one of {SOLVABLE_MODES}, got {solvable!r}")
+        self.pits = pits
+        self.pit_density = pit_density
+        self.wumpuses = wumpuses
+        self.golds = golds
+        self.solvable = solvable
+        self.max_tries = max_tries
+        self.generated = 0
+        self.rejected = 0
+        self.repaired = 0
+
+    def __repr__(self) -> str:
+        pits = f"pit_density={self.pit_density}" if self.pit_density is not None else f"pits={self.pits}"
+        return (f"CaveGenerator({pits}, wumpuses={self.wumpuses}, golds={self.golds}, "
+                f"solvable={self.solvable!r})")
+
+    def draw(self, size: int, rng, start: bool = True) -> Tuple[bytearray, List[int]]:
+        """One cave without the solvability check, and the cave indices of its gold."""
+        placed = self.placements(size, rng, start)
+        others = self.wumpuses + self.golds
+        cave = self.pit_noise(size, rng, start) if self.pit_density is not None else bytearray(size * size)
+        for i in placed[:self.wumpuses]:
+            cave[i] = WUMPUS
+        golds = placed[self.wumpuses:others]
+        for i in golds:
+            cave[i] = GOLD
+        for i in placed[others:]:
+            cave[i] = PIT
+        return cave, golds
+
+    def placements(self, size: int, rng, start: bool = True) -> List[int]:
+        """
+        Cave indices of the Wumpuses, then the gold, then the counted pits: the first draw draw() makes,
+        so the Wumpuses of a cave can be found from its RNG without generating the rest of it.
+        With start, cave index 0 is the agent's start (1, 1) and gets none of them.
+        """
+        pits = 0 if self.pit_density is not None else self.pits
+        first = 1 if start else 0
+        if pits + self.wumpuses + self.golds > size * size - first:
+            raise ValueError(f"{pits} pits, {self.wumpuses} Wumpuses and {self.golds} gold do not fit a "
+                             f"{size}x{size} cave")
+        return rng.sample(range(first, size * size), pits + self.wumpuses + self.golds)
+
+    def pit_noise(self, size: int, rng, start: bool = True) -> bytearray:
+        """
+        A pit in each room with probability pit_density, from one random byte per room: bytes below
+        the density's 1/256 floor are pits, and only rooms whose byte sits on the boundary draw again.
+        """
+        scaled = self.pit_density * 256
+        floor = int(scaled)
+        cave = bytearray(rng.randbytes(size * size).translate(_pit_table(floor)))
+        for m in _BOUNDARY.finditer(cave):
+            cave[m.start()] = PIT if rng.random() < scaled - floor else EMPTY
+        if start:
+            cave[0] = EMPTY
+        return cave
+
+    def cave(self, size: int, rng=None, start: bool = True) -> bytes:
+        """
+        size * size cell codes laid out like WumpusEnvironment.cave_bytes(). start=False treats
+        (1, 1) like any other room, for tiles of a larger cave that do not hold its start.
+        """
+        rng = rng if rng is not None else random
+        for _ in range(self.max_tries):
+            cave, golds = self.draw(size, rng, start)
+            if self.solvable is None or not golds or self.make_solvable(size, cave, golds, rng):
+                self.generated += 1
+                return bytes(cave)
+            self.rejected += 1
+        raise RuntimeError(f"no solvable {size}x{size} cave in {self.max_tries} tries with {self!r}")
+
+    def make_solvable(self, size: int, cave: bytearray, golds: List[int], rng) -> bool:
+        """True if every gold is reachable, after moving unreachable gold in 'repair' mode."""
+        stride = size + 1
+        reached = flood(size, open_rooms(size, cave))
+        stranded = [i for i in golds if not reached >> (i // size * stride + i % size) & 1]
+        if not stranded:
+            return True
+        if self.solvable != 'repair':
+            return False
+        # Reachable empty rooms (bitboard bits) to move the stranded gold to
+        targets = reached & ~1 & board_mask(size)
+        for i in golds:
+            targets &= ~(1 << (i // size * stride + i % size))
+        if targets.bit_count() < len(stranded):
+            return False
+        for i in stranded:
+            b = _random_bit(targets, stride * size, rng)
+            targets &= ~(1 << b)
+            cave[i] = EMPTY
+            cave[b // stride * size + b % stride] = GOLD
+        self.repaired += 1
+        return True
+
+
+def add_generator_arguments(parser):
+    group = parser.add_argument_group("cave generator (default: the classic 1 Wumpus, 1 gold, 3 pits)")
+    group.add_argument('--pits', type=int, default=None, help="Exact number of pits")
+    group.add_argument('--pit-density', type=float, default=None, help="Probability of a pit per room instead")
+    group.add_argument('--wumpuses', type=int, default=None)
+    group.add_argument('--golds', type=int, default=None)
+    group.add_argument('--solvable', choices=SOLVABLE_MODES, default=None,
+                       help="Reject or repair caves where gold is unreachable from (1, 1)")
+
+
+def generator_from_args(args) -> Optional[CaveGenerator]:
+    """A CaveGenerator for the add_generator_arguments options, or None to keep init_grid's caves."""
+    options = (args.pits, args.pit_density, args.wumpuses, args.golds, args.solvable)
+    if all(option is None for option in options):
+        return None
+    return CaveGenerator(3 if args.pits is None else args.pits, args.pit_density,
+                         1 if args.wumpuses is None else args.wumpuses, 1 if args.golds is None else args.golds,
+                         args.solvable)
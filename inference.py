@@ -0,0 +1,164 @@
+from math import comb
+from typing import Dict, List, Sequence, Set, Tuple
+
+from bitboard import BitBoard
+
+Cell = Tuple[int, int]
+# ({room: P} for the constrained rooms, P for every other room in `possible`, possible)
+Beliefs = Tuple[Dict[Cell, float], float, BitBoard]
+
+# AIDEV-NOTE: pits and the Wumpus are inferred independently; the rule that a room holds one feature is ignored.
+
+
+def _cell_neighbours(cell: Cell, size: int) -> List[Cell]:
+    x, y = cell
+    return [(nx, ny) for nx, ny in ((x + 1, y), (x, y + 1), (x - 1, y), (x, y - 1))
+            if 1 <= nx <= size and 1 <= ny <= size]
+
+
+def _components(constraints: List[Set[Cell]]) -> List[Tuple[List[Cell], List[Set[Cell]]]]:
+    """Splits constraints into groups that share no cells, each with its cells in constraint order."""
+    parent: Dict[Cell, Cell] = {}
+
+    def find(c):
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    for con in constraints:
+        first = None
+        for c in con:
+            parent.setdefault(c, c)
+            if first is None:
+                first = find(c)
+            else:
+                parent[find(c)] = first
+    groups: Dict[Cell, Tuple[List[Cell], List[Set[Cell]]]] = {}
+    seen: Set[Cell] = set()
+    for con in constraints:
+        cells, cons = groups.setdefault(find(next(iter(con))), ([], []))
+        cons.append(con)
+        for c in sorted(con):
+            if c not in seen:
+                seen.add(c)
+                cells.append(c)
+    return list(groups.values())
+
+
+def _enumerate(cells: List[Cell], constraints: List[Set[Cell]], max_pits: int):
+    """
+    Counts the pit assignments to `cells` that satisfy every constraint (at least one pit among
+    its cells), by number of pits k. Returns (total[k], per_cell[i][k]).
+    """
+    n = len(cells)
+    index = {c: i for i, c in enumerate(cells)}
+    # Each constraint is checked as soon as its last cell has been assigned
+    check_at: List[List[List[int]]] = [[] for _ in range(n)]
+    for con in constraints:
+        members = [index[c] for c in con]
+        check_at[max(members)].append(members)
+    total = [0] * (n + 1)
+    per_cell = [[0] * (n + 1) for _ in range(n)]
+    assign = [False] * n
+
+    def search(i, k):
+        if i == n:
+            total[k] += 1
+            for j in range(n):
+                if assign[j]:
+                    per_cell[j][k] += 1
+            return
+        for pit in (False, True):
+            if pit and k == max_pits:
+                break
+            assign[i] = pit
+            if all(any(assign[j] for j in members) for members in check_at[i]):
+                search(i + 1, k + pit)
+        assign[i] = False
+
+    search(0, 0)
+    return total, per_cell
+
+
+def _convolve(a: Sequence[int], b: Sequence[int]) -> List[int]:
+    out = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                out[i + j] += x * y
+    return out
+
+
+def pit_posteriors(size: int, visited: BitBoard, breezy: BitBoard, pits: int, cache=None) -> Beliefs:
+    """
+    Exact P(pit) given which visited rooms were breezy, for `pits` pits placed uniformly over the
+    rooms not known to be clear. Only the frontier (unknown rooms next to a breeze) is enumerated,
+    split into independent components; the remaining unknown rooms share a binomial count.
+    Component enumerations go through `cache` (a BeliefCache) when one is given.
+    Returns ({frontier room: P(pit)}, P(pit) for every other unknown room, the unknown rooms);
+    rooms outside the last are known to be clear.
+    """
+    clear = visited | (visited - breezy).neighbours()
+    unknown = clear.complement()
+    constraints = []
+    for b in breezy:
+        con = {n for n in _cell_neighbours(b, size) if n in unknown}
+        if con:
+            constraints.append(con)
+    frontier = {c for con in constraints for c in con}
+    rest = len(unknown) - len(frontier)
+
+    if cache is not None:
+        components = [cache.component(cells, cons, pits, _enumerate) for cells, cons in _components(constraints)]
+    else:
+        components = [(cells, *_enumerate(cells, cons, pits)) for cells, cons in _components(constraints)]
+    counts = [total for _, total, _ in components]
+
+    def weight(k):
+        # Ways to place the other pits in the rooms nobody has felt a breeze next to
+        return comb(rest, pits - k) if 0 <= pits - k <= rest else 0
+
+    everything = [1]
+    for total in counts:
+        everything = _convolve(everything, total)
+    z = sum(ways * weight(k) for k, ways in enumerate(everything))
+    if z == 0:
+        # Observations contradict the pit count (e.g. a custom cave); drop the count constraint
+        def weight(k):
+            return 1
+        z = sum(everything)
+    beliefs: Dict[Cell, float] = {}
+    for i, (cells, _, per_cell) in enumerate(components):
+        others = [1]
+        for j, total in enumerate(counts):
+            if j != i:
+                others = _convolve(others, total)
+        for c, by_k in zip(cells, per_cell):
+            p = sum(ways * others_ways * weight(k + m)
+                    for k, ways in enumerate(by_k) if ways
+                    for m, others_ways in enumerate(others) if others_ways)
+            beliefs[c] = p / z
+    other = 0.0
+    if rest:
+        other = sum(ways * weight(k) * (pits - k) for k, ways in enumerate(everything) if 0 <= pits - k) / (z * rest)
+    return beliefs, min(other, 1.0), unknown
+
+
+def wumpus_posteriors(size: int, visited: BitBoard, stenchy: BitBoard) -> Beliefs:
+    """
+    P(Wumpus) for the one Wumpus: uniform over the rooms next to every stench seen and next to
+    no stench-free visited room. Returns ({candidate room: P}, P for every other possible room,
+    the rooms that may hold the Wumpus).
+    """
+    possible = (visited | (visited - stenchy).neighbours()).complement()
+    if not stenchy:
+        return {}, 1 / len(possible) if possible else 0.0, possible
+    candidates = None
+    for s in stenchy:
+        around = {n for n in _cell_neighbours(s, size) if n in possible}
+        candidates = around if candidates is None else candidates & around
+    if not candidates:
+        return {}, 0.0, BitBoard(size)
+    p = 1 / len(candidates)
+    return {c: p for c in candidates}, 0.0, BitBoard(size, candidates)
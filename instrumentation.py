@@ -0,0 +1,171 @@
+import json
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+# Upper bucket bounds (inclusive, like Prometheus "le"); the last bucket is +Inf
+SECONDS_BUCKETS = [1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                   1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0]
+COUNT_BUCKETS = [2 ** i for i in range(17)]
+# What decided an action in EnhancedAgent.choose_action
+BRANCHES = ('grab', 'wumpus', 'gold_return', 'frontier', 'backtrack', 'risk', 'risk_retreat', 'climb', 'monte_carlo')
+# Path searches the agent runs: A* (risk retreat), planner.nearest_step (frontier, backtrack and risk
+# moves) and planner.DistanceField rebuilds / relaxations (the way home)
+SEARCHES = ('a_star', 'nearest_step', 'distance_field')
+
+
+class Histogram:
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: 'Histogram'):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None if empty, inf if past the last bound)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.bounds[i] if i < len(self.bounds) else float('inf')
+        return float('inf')
+
+    def to_dict(self) -> dict:
+        return {'bounds': self.bounds, 'counts': self.counts, 'count': self.count, 'sum': self.sum}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Histogram':
+        histogram = cls(list(data['bounds']))
+        histogram.counts = list(data['counts'])
+        histogram.count = data['count']
+        histogram.sum = data['sum']
+        return histogram
+
+
+class AgentStats:
+    """
+    Opt-in instrumentation for EnhancedAgent (pass it as `stats=`): choose_action latency per deciding
+    branch, nodes expanded and latency per path search (see SEARCHES), A* heap pushes per search,
+    and update_beliefs latency.
+    One instance can be shared by many agents; merge() combines instances from other processes.
+    """
+
+    def __init__(self):
+        self.decisions: Dict[str, Histogram] = {}
+        self.search_expanded: Dict[str, Histogram] = {}
+        self.search_seconds: Dict[str, Histogram] = {}
+        self.a_star_pushes = Histogram(COUNT_BUCKETS)
+        self.belief_updates = Histogram(SECONDS_BUCKETS)
+
+    def record_decision(self, branch: str, seconds: float):
+        histogram = self.decisions.get(branch)
+        if histogram is None:
+            histogram = self.decisions[branch] = Histogram(SECONDS_BUCKETS)
+        histogram.observe(seconds)
+
+    def record_search(self, search: str, expanded: int, seconds: float):
+        histogram = self.search_expanded.get(search)
+        if histogram is None:
+            histogram = self.search_expanded[search] = Histogram(COUNT_BUCKETS)
+            self.search_seconds[search] = Histogram(SECONDS_BUCKETS)
+        histogram.observe(expanded)
+        self.search_seconds[search].observe(seconds)
+
+    def record_a_star(self, expanded: int, pushes: int, seconds: float):
+        self.record_search('a_star', expanded, seconds)
+        self.a_star_pushes.observe(pushes)
+
+    def record_belief_update(self, seconds: float):
+        self.belief_updates.observe(seconds)
+
+    def merge(self, other: 'AgentStats'):
+        for branch, histogram in other.decisions.items():
+            self.decisions.setdefault(branch, Histogram(SECONDS_BUCKETS)).merge(histogram)
+        for search, histogram in other.search_expanded.items():
+            self.search_expanded.setdefault(search, Histogram(COUNT_BUCKETS)).merge(histogram)
+        for search, histogram in other.search_seconds.items():
+            self.search_seconds.setdefault(search, Histogram(SECONDS_BUCKETS)).merge(histogram)
+        self.a_star_pushes.merge(other.a_star_pushes)
+        self.belief_updates.merge(other.belief_updates)
+
+    def to_dict(self) -> dict:
+        return {
+            'choose_action_seconds': {branch: h.to_dict() for branch, h in sorted(self.decisions.items())},
+            'search_expanded': {search: h.to_dict() for search, h in sorted(self.search_expanded.items())},
+            'search_seconds': {search: h.to_dict() for search, h in sorted(self.search_seconds.items())},
+            'a_star_pushes': self.a_star_pushes.to_dict(),
+            'update_beliefs_seconds': self.belief_updates.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'AgentStats':
+        stats = cls()
+        stats.decisions = {branch: Histogram.from_dict(h) for branch, h in data['choose_action_seconds'].items()}
+        stats.search_expanded = {search: Histogram.from_dict(h) for search, h in data['search_expanded'].items()}
+        stats.search_seconds = {search: Histogram.from_dict(h) for search, h in data['search_seconds'].items()}
+        stats.a_star_pushes = Histogram.from_dict(data['a_star_pushes'])
+        stats.belief_updates = Histogram.from_dict(data['update_beliefs_seconds'])
+        return stats
+
+    def summary(self) -> dict:
+        """Counts, means and approximate p50/p99 per metric, for printing."""
+        def describe(h: Histogram) -> dict:
+            return {'count': h.count, 'mean': h.sum / h.count if h.count else None,
+                    'p50': h.quantile(0.5), 'p99': h.quantile(0.99)}
+        return {
+            'choose_action_seconds': {branch: describe(h) for branch, h in sorted(self.decisions.items())},
+            'search_expanded': {search: describe(h) for search, h in sorted(self.search_expanded.items())},
+            'search_seconds': {search: describe(h) for search, h in sorted(self.search_seconds.items())},
+            'a_star_pushes': describe(self.a_star_pushes),
+            'update_beliefs_seconds': describe(self.belief_updates),
+        }
+
+    def save_json(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def openmetrics(self, prefix: str = 'wumpus_agent') -> str:
+        """The histograms in the OpenMetrics text exposition format."""
+        lines = []
+
+        def histogram(name: str, unit: str, series: List[tuple]):
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            if unit:
+                lines.append(f"# UNIT {prefix}_{name} {unit}")
+            for labels, h in series:
+                cumulative = 0
+                for bound, n in zip(h.bounds + [float('inf')], h.counts):
+                    cumulative += n
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    lines.append(f'{prefix}_{name}_bucket{{{labels + "," if labels else ""}le="{le}"}} {cumulative}')
+                suffix = f"{{{labels}}}" if labels else ''
+                lines.append(f"{prefix}_{name}_count{suffix} {h.count}")
+                lines.append(f"{prefix}_{name}_sum{suffix} {h.sum!r}")
+
+        histogram('choose_action_seconds', 'seconds',
+                  [(f'branch="{branch}"', h) for branch, h in sorted(self.decisions.items())])
+        histogram('search_expanded', '',
+                  [(f'search="{search}"', h) for search, h in sorted(self.search_expanded.items())])
+        histogram('search_seconds', 'seconds',
+                  [(f'search="{search}"', h) for search, h in sorted(self.search_seconds.items())])
+        histogram('a_star_pushes', '', [('', self.a_star_pushes)])
+        histogram('update_beliefs_seconds', 'seconds', [('', self.belief_updates)])
+        lines.append("# EOF")
+        return '\n'.join(lines) + '\n'
+
+    def save_openmetrics(self, path: str, prefix: str = 'wumpus_agent'):
+        with open(path, 'w') as f:
+            f.write(self.openmetrics(prefix))
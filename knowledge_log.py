@@ -0,0 +1,279 @@
+import json
+import struct
+import time
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from models import Percept, PERCEPTS, BREEZE, STENCH, GLITTER, BUMP, SCREAM
+
+# AIDEV-NOTE: binary layout is versioned by MAGIC; bump it if RECORD/BELIEF change.
+MAGIC = b'WKB2'
+OLD_MAGICS = (b'WKB1',)
+# x, y, action code, percept bits (models.BREEZE..SCREAM), number of pit beliefs, number of wumpus beliefs
+RECORD = struct.Struct('<IIBBII')
+# x, y, probability
+BELIEF = struct.Struct('<IIf')
+ACTIONS = [None, "MOVE_NORTH", "MOVE_EAST", "MOVE_SOUTH", "MOVE_WEST", "SHOOT", "GRAB", "CLIMB"]
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+PERCEPT_BITS = {'breeze': BREEZE, 'stench': STENCH, 'glitter': GLITTER, 'bump': BUMP, 'scream': SCREAM}
+BELIEF_KINDS = ('belief_pit', 'belief_wumpus')
+# Probability a belief delta records for a cell that dropped out of its belief dict
+REMOVED = -1.0
+
+
+def serialize(obj):
+    # Percepts and pydantic Perceptions alike; matched by shape so this module never imports pydantic
+    if hasattr(obj, 'glitter'):
+        return {
+            'stench': obj.stench,
+            'breeze': obj.breeze,
+            'glitter': obj.glitter
+        }
+    return obj
+
+
+def _json_ready(entry: dict) -> dict:
+    # Belief dicts are keyed by (x, y) tuples, which JSON objects cannot hold
+    out = {}
+    for key, value in entry.items():
+        if isinstance(value, dict):
+            value = {f"{k[0]},{k[1]}" if isinstance(k, tuple) else k: v for k, v in value.items()}
+        elif isinstance(value, Percept):
+            # json would write the mask as a bare int without asking serialize()
+            value = serialize(value)
+        out[key] = value
+    return out
+
+
+def _percept_mask(perception) -> int:
+    """models percept bits of a Percept, a pydantic Perception or a serialize()d dict."""
+    if perception is None:
+        return 0
+    if isinstance(perception, int):
+        return perception
+    if isinstance(perception, dict):
+        return sum(bit for name, bit in PERCEPT_BITS.items() if perception.get(name))
+    return Percept.of(perception)
+
+
+class KnowledgeLogWriter:
+    """
+    Append-only knowledge-base log. Records go through a buffered file handle as JSON Lines,
+    or with binary=True as packed RECORD/BELIEF structs. The file is flushed every
+    `flush_every` records and/or `flush_interval` seconds; 0 leaves it to the buffer and close().
+    """
+
+    def __init__(self, path: str, binary: bool = False, flush_every: int = 0, flush_interval: float = 0,
+                 buffer_size: int = 1 << 16):
+        self.path = path
+        self.binary = binary
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.count = 0
+        self.last_flush = time.monotonic()
+        self.file = open(path, 'wb', buffering=buffer_size)
+        if binary:
+            self.file.write(MAGIC)
+
+    def write(self, entry: dict):
+        if self.binary:
+            self.file.write(self.pack(entry))
+        else:
+            line = json.dumps(_json_ready(entry), default=serialize, separators=(',', ':'))
+            self.file.write(line.encode() + b'\n')
+        self.count += 1
+        if self.flush_every and self.count % self.flush_every == 0:
+            self.flush()
+        elif self.flush_interval and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    @staticmethod
+    def pack(entry: dict) -> bytes:
+        x, y = entry.get('position', (0, 0))
+        pits = entry.get('belief_pit') or {}
+        wumpus = entry.get('belief_wumpus') or {}
+        parts = [RECORD.pack(x, y, ACTION_CODES[entry.get('action')], _percept_mask(entry.get('perception')),
+                             len(pits), len(wumpus))]
+        for beliefs in (pits, wumpus):
+            for (bx, by), p in beliefs.items():
+                parts.append(BELIEF.pack(bx, by, p))
+        return b''.join(parts)
+
+    def flush(self):
+        self.file.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_binary(f) -> Iterator[dict]:
+    while header := f.read(RECORD.size):
+        if len(header) < RECORD.size:
+            return  # Truncated tail of a log that was still being written
+        x, y, action, bits, n_pit, n_wumpus = RECORD.unpack(header)
+        body = f.read(BELIEF.size * (n_pit + n_wumpus))
+        if len(body) < BELIEF.size * (n_pit + n_wumpus):
+            return
+        beliefs = [((bx, by), p) for bx, by, p in BELIEF.iter_unpack(body)]
+        entry = {'position': (x, y)}
+        if ACTIONS[action] is not None:
+            entry['action'] = ACTIONS[action]
+        entry['perception'] = serialize(PERCEPTS[bits])
+        entry['belief_pit'] = dict(beliefs[:n_pit])
+        entry['belief_wumpus'] = dict(beliefs[n_pit:])
+        yield entry
+
+
+def iter_records(path: str, limit: Optional[int] = None) -> Iterator[dict]:
+    """Lazily yields the records of a log written by KnowledgeLogWriter, in either format."""
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic in OLD_MAGICS:
+            raise ValueError(f"{path} is a binary log in an older layout ({magic.decode()})")
+        if magic == MAGIC:
+            records = _read_binary(f)
+        else:
+            f.seek(0)
+            records = (json.loads(line) for line in f if line.strip())
+        for i, record in enumerate(records):
+            if limit is not None and i >= limit:
+                return
+            yield record
+
+
+class KnowledgeStore:
+    """
+    In-memory knowledge-base log kept as columns: one typed array each for step, x, y, action code
+    and percept mask (models bits). Belief dicts are diffed against the previous record, so each
+    record stores only the cells whose probability changed, plus a full copy every
+    `keyframe_every` records; beliefs(i) replays at most that many deltas from the keyframe before i.
+    Entries are copied on append, so later changes to the agent's belief dicts cannot rewrite history.
+    """
+
+    def __init__(self, keyframe_every: int = 64):
+        if keyframe_every < 1:
+            raise ValueError(f"keyframe_every must be positive, got {keyframe_every}")
+        self.keyframe_every = keyframe_every
+        self.steps = array('I')
+        self.xs = array('I')
+        self.ys = array('I')
+        self.actions = array('B')
+        self.percepts = array('B')
+        # Belief changes of record i are entries delta_start[i]:delta_start[i + 1] of the delta columns;
+        # keyframe k (the beliefs after record k * keyframe_every) likewise spans key_start[k]:key_start[k + 1]
+        self.delta_start = array('I', [0])
+        self.deltas = self.belief_columns()
+        self.key_start = array('I', [0])
+        self.keyframes = self.belief_columns()
+        # Record indices per position, for records_at / steps_at
+        self.at: Dict[Tuple[int, int], array] = {}
+        # Beliefs after the last record, to diff the next one against
+        self.current: List[dict] = [{} for _ in BELIEF_KINDS]
+
+    @staticmethod
+    def belief_columns() -> Tuple[array, array, array, array]:
+        """kind (index into BELIEF_KINDS), x, y, probability."""
+        return array('B'), array('I'), array('I'), array('d')
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def append(self, entry: dict):
+        """Adds a KnowledgeBase.tell entry; `step` defaults to the record's index."""
+        i = len(self.xs)
+        x, y = entry.get('position', (0, 0))
+        self.steps.append(entry.get('step', i))
+        self.xs.append(x)
+        self.ys.append(y)
+        self.actions.append(ACTION_CODES[entry.get('action')])
+        self.percepts.append(_percept_mask(entry.get('perception')))
+        self.at.setdefault((x, y), array('I')).append(i)
+        kinds, dxs, dys, ps = self.deltas
+        for kind, name in enumerate(BELIEF_KINDS):
+            old, new = self.current[kind], entry.get(name) or {}
+            for (bx, by), p in new.items():
+                if old.get((bx, by)) != p:
+                    kinds.append(kind)
+                    dxs.append(bx)
+                    dys.append(by)
+                    ps.append(p)
+            for bx, by in old.keys() - new.keys():
+                kinds.append(kind)
+                dxs.append(bx)
+                dys.append(by)
+                ps.append(REMOVED)
+            self.current[kind] = dict(new)
+        self.delta_start.append(len(kinds))
+        if i % self.keyframe_every == 0:
+            kinds, dxs, dys, ps = self.keyframes
+            for kind, beliefs in enumerate(self.current):
+                for (bx, by), p in beliefs.items():
+                    kinds.append(kind)
+                    dxs.append(bx)
+                    dys.append(by)
+                    ps.append(p)
+            self.key_start.append(len(kinds))
+
+    @staticmethod
+    def apply(beliefs: List[dict], columns, start: int, stop: int):
+        kinds, xs, ys, ps = columns
+        for j in range(start, stop):
+            if ps[j] == REMOVED:
+                del beliefs[kinds[j]][xs[j], ys[j]]
+            else:
+                beliefs[kinds[j]][xs[j], ys[j]] = ps[j]
+
+    def beliefs(self, i: int) -> Tuple[dict, dict]:
+        """(belief_pit, belief_wumpus) as they were told in record i."""
+        if not 0 <= i < len(self.xs):
+            raise IndexError(i)
+        k = i // self.keyframe_every
+        beliefs = [{} for _ in BELIEF_KINDS]
+        self.apply(beliefs, self.keyframes, self.key_start[k], self.key_start[k + 1])
+        self.apply(beliefs, self.deltas, self.delta_start[k * self.keyframe_every + 1], self.delta_start[i + 1])
+        return beliefs[0], beliefs[1]
+
+    def entry(self, i: int, beliefs: Optional[Tuple[dict, dict]] = None) -> dict:
+        """Record i in the shape it was told, with the Percept for its mask."""
+        pit, wumpus = beliefs if beliefs is not None else self.beliefs(i)
+        entry = {'step': self.steps[i], 'position': (self.xs[i], self.ys[i])}
+        if ACTIONS[self.actions[i]] is not None:
+            entry['action'] = ACTIONS[self.actions[i]]
+        entry['perception'] = PERCEPTS[self.percepts[i]]
+        entry['belief_pit'] = pit
+        entry['belief_wumpus'] = wumpus
+        return entry
+
+    def __getitem__(self, i: int) -> dict:
+        return self.entry(i if i >= 0 else len(self.xs) + i)
+
+    def __iter__(self) -> Iterator[dict]:
+        # Replays the deltas once front to back instead of from a keyframe per record
+        beliefs = [{} for _ in BELIEF_KINDS]
+        for i in range(len(self.xs)):
+            self.apply(beliefs, self.deltas, self.delta_start[i], self.delta_start[i + 1])
+            yield self.entry(i, (dict(beliefs[0]), dict(beliefs[1])))
+
+    def records_at(self, x: int, y: int) -> List[int]:
+        """Indices of the records told at (x, y), in order."""
+        return list(self.at.get((x, y), ()))
+
+    def steps_at(self, x: int, y: int) -> List[int]:
+        return [self.steps[i] for i in self.at.get((x, y), ())]
+
+    def nbytes(self) -> int:
+        columns = (self.steps, self.xs, self.ys, self.actions, self.percepts, self.delta_start, self.key_start,
+                   *self.deltas, *self.keyframes, *self.at.values())
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def save_json(self, path: str):
+        with open(path, 'w') as f:
+            json.dump([_json_ready(entry) for entry in self], f, indent=2, default=serialize)
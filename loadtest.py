@@ -0,0 +1,113 @@
+import asyncio
+import random
+import sys
+import time
+from typing import List
+
+from client import GameClient
+from models import GLITTER
+from server import DEFAULT_HOST, DEFAULT_PORT, GameServer, MOVES
+
+MOVE_ACTIONS = list(MOVES)
+
+
+def random_actions(rng: random.Random, state: dict, n: int) -> List[str]:
+    """A random walker that grabs on glitter; good enough to keep every session busy until it dies."""
+    if state['percept'] & GLITTER:
+        return ['GRAB'] + [rng.choice(MOVE_ACTIONS) for _ in range(n - 1)]
+    return [rng.choice(MOVE_ACTIONS) for _ in range(n)]
+
+
+async def play(client: GameClient, rng: random.Random, deadline: float, batch: int, size: int,
+               latencies: List[float], counts: List[int]):
+    """Plays episodes back to back on one session at a time until `deadline`, timing every request."""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        state = await client.new_session(size, seed=rng.getrandbits(32))
+        latencies.append(time.perf_counter() - start)
+        sid = state['session']
+        while state['outcome'] is None and time.perf_counter() < deadline:
+            actions = random_actions(rng, state, batch)
+            start = time.perf_counter()
+            if batch == 1:
+                states = [await client.act(sid, actions[0])]
+            else:
+                states = await client.step(sid, actions)
+            latencies.append(time.perf_counter() - start)
+            counts[0] += len(states)
+            state = states[-1]
+        start = time.perf_counter()
+        await client.close_session(sid)
+        latencies.append(time.perf_counter() - start)
+        counts[1] += 1
+
+
+async def load_test(sessions: int = 1000, connections: int = 4, duration: float = 5.0, batch: int = 1,
+                    size: int = 4, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path=None,
+                    spawn: bool = True, seed: int = 0) -> dict:
+    """
+    Drives `sessions` concurrent sessions over `connections` pipelined connections for `duration`
+    seconds. With `spawn`, an in-process server on a free port is used instead of host/port/path.
+    """
+    listener = None
+    if spawn:
+        listener = await GameServer(max_sessions=sessions).start(host, 0, path)
+        if not path:
+            host, port = listener.sockets[0].getsockname()[:2]
+    clients = [await GameClient.connect(host, port, path) for _ in range(connections)]
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    counts = [0, 0]  # actions, episodes
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(play(clients[i % connections], random.Random(rng.getrandbits(64)), deadline, batch,
+                                size, latencies, counts) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+    if listener is not None:
+        listener.close()
+        await listener.wait_closed()
+    latencies.sort()
+    n = len(latencies)
+    return {
+        'requests': n,
+        'actions': counts[0],
+        'episodes': counts[1],
+        'seconds': elapsed,
+        'requests_per_s': n / elapsed,
+        'actions_per_s': counts[0] / elapsed,
+        'p50': latencies[n // 2] if n else 0.0,
+        'p99': latencies[min(n - 1, int(n * 0.99))] if n else 0.0,
+        'max': latencies[-1] if n else 0.0,
+    }
+
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Load-test the game server with random-walking sessions.")
+    parser.add_argument('-s', '--sessions', type=int, default=1000, help="Concurrent sessions")
+    parser.add_argument('-c', '--connections', type=int, default=4)
+    parser.add_argument('-d', '--duration', type=float, default=5.0, help="Seconds")
+    parser.add_argument('-b', '--batch', type=int, default=1, help="Actions per step message (1: one act per request)")
+    parser.add_argument('--size', type=int, default=4, help="Cave width and height")
+    parser.add_argument('--remote', action='store_true',
+                        help="Test a running server at --host/--port or --unix instead of an in-process one")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('-p', '--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', default=None, metavar='PATH', help="Use a Unix socket")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = asyncio.run(load_test(args.sessions, args.connections, args.duration, args.batch, args.size,
+                                   args.host, args.port, args.unix, not args.remote))
+    print(f"Requests:   {result['requests']} in {result['seconds']:.2f}s ({result['requests_per_s']:.0f}/s)")
+    print(f"Actions:    {result['actions']} ({result['actions_per_s']:.0f}/s), {result['episodes']} episodes")
+    print(f"Latency:    p50 {result['p50'] * 1e3:.2f} ms, p99 {result['p99'] * 1e3:.2f} ms, "
+          f"max {result['max'] * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
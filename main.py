@@ -1,31 +1,55 @@
+import argparse
 import pygame
 import sys
+import time
+from corpus import episode_seed
 from environment import WumpusEnvironment
 from agent import EnhancedAgent
-from models import Position, Direction
+from episode_trace import EpisodeRecorder, TraceReader, TraceWriter
+from models import Direction, Feature, BREEZE, STENCH, GLITTER, BUMP, SCREAM
 from agent import KnowledgeBase
 
+SYMBOLS = ('breeze', 'stench', 'glitter', 'pit', 'wumpus', 'gold', 'agent', 'pit_x', 'wumpus_x', 'wumpus_dead_x')
+MESSAGES = {
+    'pit': "You fell into a pit!",
+    'wumpus': "You were eaten by the Wumpus!",
+    'escaped': "You escaped with the gold!",
+    'climbed': "You climbed out without the gold.",
+}
+
 
 class WumpusGame:
-    def __init__(self):
+    def __init__(self, size=4, autoplay=False, speed=4, render_every=1, max_steps=None, trace=None, seed=None):
         pygame.init()
+        self.autoplay = autoplay
+        self.speed = speed
+        self.render_every = render_every
+        # Autoplay pauses after this many steps, in case the agent wanders forever
+        self.max_steps = max_steps
+        # Episode trace file the game is recorded to, if any
+        self.trace = trace
+        self.recorder = None
         self.cell_size = 80
-        self.cave_cols = 4
-        self.cave_rows = 4
+        self.cave_cols = size
+        self.cave_rows = size
         self.legend_width = 420
         self.left_offset = 40  # Add left margin
         self.width = self.left_offset + self.cell_size * self.cave_cols + self.legend_width
         self.height = max(self.cell_size * self.cave_rows + 40, 600)
         self.screen = pygame.display.set_mode((self.width, self.height))
         pygame.display.set_caption("Wumpus World")
-        self.env = WumpusEnvironment()
-        self.agent = EnhancedAgent()
+        self.env = WumpusEnvironment(size, seed=seed)
+        self.agent = EnhancedAgent(size=size)
         # Set agent position and direction to match environment
         self.agent.x = 1
         self.agent.y = 1
         self.agent.dir = Direction.EAST
         self.font = pygame.font.Font(None, 36)
         self.wumpus_dead = False
+        self.build_static_surfaces()
+        self.drawn_layers = {}
+        self.drawn_score = None
+        self.drawn_wumpus = None
         # Initialize knowledge base
         self.agent.kb = KnowledgeBase()
 
@@ -62,7 +86,10 @@ class WumpusGame:
             pygame.draw.line(surface, (0,0,0), (cx-20, cy-20), (cx+20, cy+20), 4)
             pygame.draw.line(surface, (0,0,0), (cx+20, cy-20), (cx-20, cy+20), 4)
 
-    def draw_legend(self):
+    def legend_surface(self, wumpus_dead):
+        """The legend panel, rendered once per wumpus_dead state (the stench symbol hides once it is dead)."""
+        if wumpus_dead in self.legend_surfaces:
+            return self.legend_surfaces[wumpus_dead]
         legend_items = [
             ('breeze', 'Breeze: There is a pit in an adjacent cell'),
             ('stench', 'Stench: There is a Wumpus in an adjacent cell'),
@@ -75,70 +102,140 @@ class WumpusGame:
             ('gold', 'Gold: The gold'),
             ('agent', 'Agent: You'),
         ]
-        legend_x = self.left_offset + self.cell_size * self.cave_cols + 40
+        surface = pygame.Surface((self.legend_width, self.height))
+        surface.fill((255, 255, 255))
+        legend_x = 40
         legend_y = 40
-        header_font = pygame.font.Font(None, 28)
-        explanation_font = pygame.font.Font(None, 20)
-        header = header_font.render("Legend", True, (0,0,0))
-        self.screen.blit(header, (legend_x, legend_y))
-        explanation = explanation_font.render("Symbols and their meaning:", True, (0,0,0))
-        self.screen.blit(explanation, (legend_x, legend_y + 28))
+        header = self.header_font.render("Legend", True, (0,0,0))
+        surface.blit(header, (legend_x, legend_y))
+        explanation = self.explanation_font.render("Symbols and their meaning:", True, (0,0,0))
+        surface.blit(explanation, (legend_x, legend_y + 28))
         for i, (symbol, label) in enumerate(legend_items):
             cy = legend_y + 65 + i * 44
             cx = legend_x + 20
-            self.draw_symbol(symbol, self.screen, cx, cy, wumpus_dead=self.wumpus_dead)
-            text = explanation_font.render(label, True, (0,0,0))
-            self.screen.blit(text, (cx + 50, cy - 12))
+            self.draw_symbol(symbol, surface, cx, cy, wumpus_dead=wumpus_dead)
+            text = self.explanation_font.render(label, True, (0,0,0))
+            surface.blit(text, (cx + 50, cy - 12))
+        self.legend_surfaces[wumpus_dead] = surface
+        return surface
 
-    def draw(self):
-        self.screen.fill((255, 255, 255))
-        # Draw score at the top center of the cave
+    def draw_legend(self):
+        self.screen.blit(self.legend_surface(self.wumpus_dead), (self.left_offset + self.cell_size * self.cave_cols, 0))
+
+    def build_static_surfaces(self):
+        """Pre-renders what never changes: the empty grid, one sprite per symbol, and the legend fonts."""
+        self.background = pygame.Surface((self.width, self.height))
+        self.background.fill((255, 255, 255))
+        for x in range(self.cave_cols):
+            for y in range(self.cave_rows):
+                pygame.draw.rect(self.background, (0, 0, 0), self.cell_rect((x + 1, y + 1)), 1)
+        self.sprites = {}
+        for symbol in SYMBOLS:
+            sprite = pygame.Surface((self.cell_size, self.cell_size), pygame.SRCALPHA)
+            self.draw_symbol(symbol, sprite, self.cell_size // 2, self.cell_size // 2)
+            self.sprites[symbol] = sprite
+        self.header_font = pygame.font.Font(None, 28)
+        self.explanation_font = pygame.font.Font(None, 20)
+        self.legend_surfaces = {}
+
+    def cell_rect(self, cell):
+        x, y = cell
+        return pygame.Rect(self.left_offset + (x - 1) * self.cell_size, (self.cave_rows - y) * self.cell_size + 40,
+                           self.cell_size, self.cell_size)
+
+    def cell_layers(self, cell):
+        """Symbols shown on a cell during play, bottom to top."""
+        layers = []
+        # Only show perceptions for visited cells
+        if cell in self.agent.visited:
+            bits = self.env.percept_bits(*cell)
+            if bits & BREEZE:
+                layers.append('breeze')
+            if bits & STENCH and not self.wumpus_dead:
+                layers.append('stench')
+            if bits & GLITTER:
+                layers.append('glitter')
+        # Show inferred pits (red X) and inferred wumpus (purple X)
+        if cell in self.agent.unsafe:
+            layers.append('pit_x')
+        wumpus_location = self.agent.wumpus_location
+        if wumpus_location is not None and cell == wumpus_location[:2]:
+            if self.agent.wumpus_inferred and not self.wumpus_dead:
+                layers.append('wumpus_x')
+            # Draw a black X where the Wumpus was killed, if known
+            if self.wumpus_dead:
+                layers.append('wumpus_dead_x')
+        if cell == (self.agent.x, self.agent.y):
+            layers.append('agent')
+        return tuple(layers)
+
+    def draw_cell(self, cell, layers):
+        rect = self.cell_rect(cell)
+        self.screen.blit(self.background, rect, rect)
+        for symbol in layers:
+            self.screen.blit(self.sprites[symbol], rect)
+        if layers:
+            self.drawn_layers[cell] = layers
+        else:
+            self.drawn_layers.pop(cell, None)
+        return rect
+
+    def draw_score(self):
         score = getattr(self.agent, 'performance', 0)
+        area = pygame.Rect(self.left_offset, 0, self.cell_size * self.cave_cols, 40)
+        self.screen.blit(self.background, area, area)
+        # Draw score at the top center of the cave
         score_text = self.font.render(f"Score: {score}", True, (0, 0, 0))
         score_x = self.left_offset + (self.cell_size * self.cave_cols) // 2 - score_text.get_width() // 2
         score_y = 5
         self.screen.blit(score_text, (score_x, score_y))
-        # Draw cave grid and contents
-        for x in range(self.cave_cols):
-            for y in range(self.cave_rows):
-                rect = pygame.Rect(self.left_offset + x * self.cell_size, y * self.cell_size + 40,
-                                   self.cell_size, self.cell_size)
-                pygame.draw.rect(self.screen, (0, 0, 0), rect, 1)
-                # Only show perceptions for visited cells
-                if (x+1, y+1) in self.agent.visited:
-                    pos = Position(x=x+1, y=y+1)
-                    perception = self.env.get_perception(pos)
-                    cx = self.left_offset + x * self.cell_size + self.cell_size // 2
-                    cy = (self.cave_rows - 1 - y) * self.cell_size + self.cell_size // 2 + 40
-                    if perception.breeze:
-                        self.draw_symbol('breeze', self.screen, cx, cy, wumpus_dead=self.wumpus_dead)
-                    if perception.stench and not self.wumpus_dead:
-                        self.draw_symbol('stench', self.screen, cx, cy, wumpus_dead=self.wumpus_dead)
-                    if perception.glitter:
-                        self.draw_symbol('glitter', self.screen, cx, cy, wumpus_dead=self.wumpus_dead)
-                # Show inferred pits (red X) and inferred wumpus (purple X)
-                cell = (x+1, y+1)
-                cx = self.left_offset + x * self.cell_size + self.cell_size // 2
-                cy = (self.cave_rows - 1 - y) * self.cell_size + self.cell_size // 2 + 40
-                if cell in getattr(self.agent, 'unsafe', set()):
-                    self.draw_symbol('pit_x', self.screen, cx, cy)
-                if self.agent.wumpus_inferred and self.agent.wumpus_location is not None:
-                    wx, wy, _ = self.agent.wumpus_location
-                    if (x+1, y+1) == (wx, wy) and not self.wumpus_dead:
-                        self.draw_symbol('wumpus_x', self.screen, cx, cy)
-        # Draw a black X where the Wumpus was killed, if known
-        if self.wumpus_dead and self.agent.wumpus_location is not None:
-            wx, wy, _ = self.agent.wumpus_location
-            cx = self.left_offset + (wx-1) * self.cell_size + self.cell_size // 2
-            cy = (self.cave_rows - wy) * self.cell_size + self.cell_size // 2 + 40
-            self.draw_symbol('wumpus_dead_x', self.screen, cx, cy)
-        pos_x, pos_y = self.agent.x, self.agent.y
-        x = self.left_offset + (pos_x - 1) * self.cell_size + self.cell_size // 2
-        y = (self.cave_rows - pos_y) * self.cell_size + self.cell_size // 2 + 40
-        self.draw_symbol('agent', self.screen, x, y)
+        self.drawn_score = score
+        return area
+
+    def snapshot(self):
+        """Remembers the agent state the screen shows, so the next draw() can diff against it."""
+        self.drawn_visited = self.agent.visited.copy()
+        self.drawn_unsafe = self.agent.unsafe.copy()
+        self.drawn_agent = (self.agent.x, self.agent.y)
+        self.drawn_wumpus = (self.agent.wumpus_inferred, self.agent.wumpus_location, self.wumpus_dead)
+
+    def redraw_all(self):
+        self.screen.blit(self.background, (0, 0))
+        self.drawn_layers = {}
+        for x in range(1, self.cave_cols + 1):
+            for y in range(1, self.cave_rows + 1):
+                layers = self.cell_layers((x, y))
+                if layers:
+                    self.draw_cell((x, y), layers)
+        self.draw_score()
         self.draw_legend()
+        self.snapshot()
         pygame.display.flip()
 
+    def draw(self):
+        # AIDEV-NOTE: dirty-rect renderer - only cells whose symbols changed since the last frame are re-blitted.
+        if self.drawn_wumpus is None or self.drawn_wumpus[2] != self.wumpus_dead:
+            self.redraw_all()
+            return
+        changed = set(self.agent.visited ^ self.drawn_visited) | set(self.agent.unsafe ^ self.drawn_unsafe)
+        changed.add(self.drawn_agent)
+        changed.add((self.agent.x, self.agent.y))
+        wumpus = (self.agent.wumpus_inferred, self.agent.wumpus_location, self.wumpus_dead)
+        if wumpus != self.drawn_wumpus:
+            for location in (self.drawn_wumpus[1], self.agent.wumpus_location):
+                if location is not None:
+                    changed.add(location[:2])
+        dirty = []
+        for cell in changed:
+            layers = self.cell_layers(cell)
+            if self.drawn_layers.get(cell, ()) != layers:
+                dirty.append(self.draw_cell(cell, layers))
+        if getattr(self.agent, 'performance', 0) != self.drawn_score:
+            dirty.append(self.draw_score())
+        self.snapshot()
+        if dirty:
+            pygame.display.update(dirty)
+
     def draw_full_cave(self):
         self.screen.fill((255, 255, 255))
         # Draw score at the top center of the cave
@@ -152,7 +249,6 @@ class WumpusGame:
                 rect = pygame.Rect(self.left_offset + x * self.cell_size, y * self.cell_size + 40,
                                    self.cell_size, self.cell_size)
                 pygame.draw.rect(self.screen, (0, 0, 0), rect, 1)
-                pos = Position(x=x+1, y=y+1)
                 cx = self.left_offset + x * self.cell_size + self.cell_size // 2
                 cy = (self.cave_rows - 1 - y) * self.cell_size + self.cell_size // 2 + 40
                 # Show all features
@@ -167,7 +263,7 @@ class WumpusGame:
                         elif feature.name == 'GOLD':
                             self.draw_symbol('gold', self.screen, cx, cy)
                 # Show all sensor inputs
-                perception = self.env.get_perception(pos)
+                perception = self.env.percept(x + 1, y + 1)
                 if perception.breeze:
                     self.draw_symbol('breeze', self.screen, cx, cy)
                 if perception.stench:
@@ -182,81 +278,232 @@ class WumpusGame:
         self.draw_legend()
         pygame.display.flip()
 
+    def agent_action(self):
+        perception = self.env.percept(self.agent.x, self.agent.y)
+        return self.agent.choose_action(perception, self.bump, self.scream)
+
+    def handle_key(self, key):
+        """Returns the action for a key press, if any. A toggles autoplay."""
+        # Map arrow keys to direct move actions
+        if key == pygame.K_UP:
+            return "MOVE_NORTH"
+        elif key == pygame.K_RIGHT:
+            return "MOVE_EAST"
+        elif key == pygame.K_DOWN:
+            return "MOVE_SOUTH"
+        elif key == pygame.K_LEFT:
+            return "MOVE_WEST"
+        elif key == pygame.K_SPACE:
+            return self.agent_action()
+        elif key == pygame.K_a:
+            self.autoplay = not self.autoplay
+        return None
+
+    def step(self, action):
+        """Applies one action. Returns the end-of-game message, or None while the game goes on."""
+        before = self.agent.performance
+        self.bump, self.scream, died, death_type, climbed_out = self.agent.update_position(action, self.env)
+        self.steps += 1
+        message = None
+        if self.scream:
+            self.wumpus_dead = True
+        elif died:
+            self.outcome = death_type
+            message = MESSAGES.get(death_type, "You died!")
+        elif climbed_out:
+            self.outcome = 'escaped' if self.agent.has_gold else 'climbed'
+            message = MESSAGES[self.outcome]
+        if self.recorder is not None:
+            bits = (self.env.percept_bits(self.agent.x, self.agent.y)
+                    | (BUMP if self.bump else 0) | (SCREAM if self.scream else 0))
+            self.recorder.record(self.agent.x, self.agent.y, action, bits, self.agent.performance - before)
+        # Log percepts and actions during the game loop
+        perception = self.env.percept(self.agent.x, self.agent.y)
+        self.agent.kb.tell({
+            'position': (self.agent.x, self.agent.y),
+            'action': action,
+            'perception': perception,
+            'belief_pit': self.agent.belief_pit,
+            'belief_wumpus': self.agent.belief_wumpus
+        })
+        return message
+
+    def next_events(self):
+        """
+        Blocks until there is something to do: input, or the next autoplay step being due.
+        At full autoplay speed it never blocks and just drains the queue.
+        """
+        if not self.autoplay:
+            return [pygame.event.wait()] + pygame.event.get()
+        if self.speed:
+            wait_ms = int((self.last_step + 1 / self.speed - time.monotonic()) * 1000)
+            if wait_ms > 0:
+                event = pygame.event.wait(wait_ms)
+                if event.type != pygame.NOEVENT:
+                    return [event] + pygame.event.get()
+                return []
+        return pygame.event.get()
+
     def run(self):
-        clock = pygame.time.Clock()
-        running = True
-        bump = False
-        scream = False
+        # AIDEV-NOTE: event-driven loop - it sleeps in next_events() instead of redrawing at a fixed FPS.
+        self.bump = False
+        self.scream = False
+        self.steps = 0
+        self.outcome = 'timeout'
+        self.last_step = time.monotonic()
+        if self.trace:
+            self.recorder = EpisodeRecorder(self.env)
         death_message = None
-        died = False
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.KEYDOWN:
-                    # Map arrow keys to direct move actions
-                    if event.key == pygame.K_UP:
-                        action = "MOVE_NORTH"
-                    elif event.key == pygame.K_RIGHT:
-                        action = "MOVE_EAST"
-                    elif event.key == pygame.K_DOWN:
-                        action = "MOVE_SOUTH"
-                    elif event.key == pygame.K_LEFT:
-                        action = "MOVE_WEST"
-                    elif event.key == pygame.K_SPACE:
-                        pos = Position(x=self.agent.x, y=self.agent.y)
-                        perception = self.env.get_perception(pos)
-                        action = self.agent.choose_action(perception, bump, scream)
-                    else:
-                        action = None
-                    if action:
-                        bump, scream, died, death_type, climbed_out = self.agent.update_position(action, self.env)
-                        if scream:
-                            self.wumpus_dead = True
-                        elif died:
-                            if death_type == 'pit':
-                                death_message = "You fell into a pit!"
-                            elif death_type == 'wumpus':
-                                death_message = "You were eaten by the Wumpus!"
-                            else:
-                                death_message = "You died!"
-                            running = False
-                        elif climbed_out:
-                            if self.agent.has_gold:
-                                death_message = "You escaped with the gold!"
-                            else:
-                                death_message = "You climbed out without the gold."
-                            running = False
-                        # Log percepts and actions during the game loop
-                        pos = Position(x=self.agent.x, y=self.agent.y)
-                        perception = self.env.get_perception(pos)
-                        self.agent.kb.tell({
-                            'position': (self.agent.x, self.agent.y),
-                            'action': action,
-                            'perception': perception,
-                            'belief_pit': self.agent.belief_pit,
-                            'belief_wumpus': self.agent.belief_wumpus
-                        })
-                        self.agent.kb.save_json('knowledge_base.json')
-            self.draw()
-            clock.tick(60)
+        running = True
+        # Only these events wake the loop up
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN, pygame.WINDOWEXPOSED])
+        self.draw()
+        # Stream the knowledge base to an append-only log instead of rewriting JSON per step
+        with self.agent.kb.stream('knowledge_base.jsonl', flush_every=1):
+            while running and death_message is None:
+                stepped = False
+                for event in self.next_events():
+                    if event.type == pygame.QUIT:
+                        running = False
+                    elif event.type == pygame.KEYDOWN:
+                        action = self.handle_key(event.key)
+                        if action:
+                            death_message = self.step(action)
+                            stepped = True
+                    elif event.type == pygame.WINDOWEXPOSED:
+                        self.redraw_all()
+                    if death_message or not running:
+                        break
+                if running and death_message is None and self.autoplay:
+                    if not self.speed or time.monotonic() - self.last_step >= 1 / self.speed:
+                        death_message = self.step(self.agent_action())
+                        self.last_step = time.monotonic()
+                        stepped = True
+                        if self.max_steps and self.steps >= self.max_steps:
+                            self.autoplay = False
+                            self.draw()
+                # Fast-forward renders every render_every-th step only (0: just the final state)
+                fast_forward = self.autoplay and not self.speed
+                if stepped and (not fast_forward or (self.render_every and self.steps % self.render_every == 0)):
+                    self.draw()
+        if self.recorder is not None:
+            with TraceWriter(self.trace) as writer:
+                writer.write_episode(self.recorder.finish(self.agent.performance, self.outcome))
         if death_message:
             self.draw_full_cave()
             msg = self.font.render(death_message, True, (255, 0, 0))
             self.screen.blit(msg, (50, 200))
             pygame.display.flip()
             # Wait for any key before closing
-            waiting = True
-            while waiting:
-                for event in pygame.event.get():
-                    if event.type == pygame.KEYDOWN or event.type == pygame.QUIT:
-                        waiting = False
+            while pygame.event.wait().type not in (pygame.KEYDOWN, pygame.QUIT):
+                pass
+        pygame.quit()
+
+    def replay_to(self, episode, i):
+        """Shows the recorded episode after its first i steps, from the trace alone (nothing is re-simulated)."""
+        if i < self.replay_step:
+            # Going back: start over from the recorded cave
+            self.env.grid = episode.grid()
+            self.agent = EnhancedAgent(size=episode.size)
+            self.agent.visited.add((1, 1))
+            self.wumpus_dead = False
+            self.replay_step = 0
+        for j in range(self.replay_step, i):
+            x, y, action, bits, delta = episode.step(j)
+            if bits & SCREAM:
+                for cell in [cell for cell, feature in self.env.grid.items() if feature == Feature.WUMPUS]:
+                    del self.env.grid[cell]
+                self.wumpus_dead = True
+            self.agent.x, self.agent.y = x, y
+            self.agent.visited.add((x, y))
+            self.agent.performance += delta
+        self.replay_step = i
+        if i == len(episode):
+            self.draw_full_cave()
+            msg = self.font.render(MESSAGES.get(episode.outcome, "Out of steps."), True, (255, 0, 0))
+            self.screen.blit(msg, (50, 200))
+            pygame.display.flip()
+            # Make the next draw() start from a clean screen
+            self.drawn_wumpus = None
+        else:
+            self.draw()
+
+    def replay(self, path, index=0):
+        """
+        Plays back episode `index` of an episode trace. RIGHT/SPACE step forward, LEFT steps back,
+        HOME/END jump to either end, A toggles autoplay at `speed`, ESC quits.
+        """
+        with TraceReader(path) as reader:
+            episode = reader[index]
+            self.replay_step = len(episode) + 1  # forces replay_to to load the recorded cave
+            self.replay_to(episode, 0)
+            pygame.event.set_blocked(None)
+            pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN, pygame.WINDOWEXPOSED])
+            self.last_step = time.monotonic()
+            while True:
+                target = self.replay_step
+                events = self.next_events()
+                if any(event.type == pygame.QUIT for event in events):
+                    break
+                keys = [event.key for event in events if event.type == pygame.KEYDOWN]
+                if pygame.K_ESCAPE in keys:
+                    break
+                for key in keys:
+                    if key in (pygame.K_RIGHT, pygame.K_SPACE):
+                        target += 1
+                    elif key == pygame.K_LEFT:
+                        target -= 1
+                    elif key == pygame.K_HOME:
+                        target = 0
+                    elif key == pygame.K_END:
+                        target = len(episode)
+                    elif key == pygame.K_a:
+                        self.autoplay = not self.autoplay
+                if self.autoplay and (not self.speed or time.monotonic() - self.last_step >= 1 / self.speed):
+                    target += 1
+                    self.last_step = time.monotonic()
+                target = max(0, min(target, len(episode)))
+                if target == len(episode):
+                    self.autoplay = False
+                if target != self.replay_step:
+                    self.replay_to(episode, target)
+                elif any(event.type == pygame.WINDOWEXPOSED for event in events):
+                    self.drawn_wumpus = None
+                    self.replay_to(episode, target)
+            del episode
         pygame.quit()
 
 
-def main():
-    game = WumpusGame()
-    game.run()
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Watch EnhancedAgent explore the Wumpus cave.")
+    parser.add_argument('--size', type=int, default=4, help="Cave width and height")
+    parser.add_argument('--autoplay', action='store_true', help="Let the agent play without key presses (A toggles)")
+    parser.add_argument('--speed', type=float, default=4, help="Autoplay steps per second, 0 for as fast as possible")
+    parser.add_argument('--render-every', type=int, default=1,
+                        help="At full speed, render every Nth step only (0: just the final state)")
+    parser.add_argument('--max-steps', type=int, default=None, help="Pause autoplay after this many steps")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Play the cave runner and corpus use for episode --episode of this seed")
+    parser.add_argument('--trace', default=None, metavar='FILE', help="Record the game to this episode trace")
+    parser.add_argument('--replay', default=None, metavar='FILE', help="Play back an episode trace instead")
+    parser.add_argument('--episode', type=int, default=0, help="Episode of --seed to play, or of the --replay trace")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    size = args.size
+    if args.replay:
+        with TraceReader(args.replay) as reader:
+            size = reader[args.episode].size
+    game = WumpusGame(size, autoplay=args.autoplay, speed=args.speed, render_every=args.render_every,
+                      max_steps=args.max_steps, trace=args.trace,
+                      seed=episode_seed(args.seed, args.episode) if args.seed is not None else None)
+    if args.replay:
+        game.replay(args.replay, args.episode)
+    else:
+        game.run()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,15 @@
 from enum import Enum
-from pydantic import BaseModel
-from typing import List, Tuple, Set, Dict
+from typing import NamedTuple
+
+# AIDEV-NOTE: keep this module free of pydantic - the headless core imports it on every worker spawn.
+# Position, Perception and GameState live in schemas.py and are loaded on first access (see __getattr__).
+_SCHEMAS = ('Position', 'Perception', 'GameState')
+
+def __getattr__(name):
+    if name in _SCHEMAS:
+        import schemas
+        return getattr(schemas, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class Direction(Enum):
     NORTH = 0
@@ -8,29 +17,63 @@ class Direction(Enum):
     SOUTH = 2
     WEST = 3
 
-class Position(BaseModel):
-    x: int
-    y: int
-
 class Feature(Enum):
     WUMPUS = "W"
     PIT = "P"
     GOLD = "G"
     EMPTY = "."
 
-class Perception(BaseModel):
-    breeze: bool = False
-    stench: bool = False
-    glitter: bool = False
-    bump: bool = False
-    scream: bool = False
-
-class GameState(BaseModel):
-    score: int = 0
-    has_arrow: bool = True
-    has_gold: bool = False
-    agent_pos: Position
-    agent_dir: Direction
-    known_pits: Set[Tuple[int, int]] = set()
-    known_wumpus: Set[Tuple[int, int]] = set()
-    visited: Set[Tuple[int, int]] = set()
+# Percept bits, as stored in WumpusEnvironment.percepts and returned by BatchWumpusEnvironment.perceive()
+BREEZE = 1
+STENCH = 2
+GLITTER = 4
+# Only known after an action, so never part of a room's percept table
+BUMP = 8
+SCREAM = 16
+
+# AIDEV-NOTE: Pos and Percept are the hot-loop types; the pydantic Position/Perception are for
+# serialization and API boundaries only - convert with the helpers below, never inside the step loop.
+
+class Pos(NamedTuple):
+    """Allocation-light position: an (x, y) tuple with names, interchangeable with cell tuples."""
+    x: int
+    y: int
+
+    @classmethod
+    def of(cls, position) -> 'Pos':
+        return cls(position.x, position.y)
+
+    def to_position(self) -> 'Position':
+        from schemas import Position
+        return Position(x=self.x, y=self.y)
+
+class Percept(int):
+    """Percept bit mask (BREEZE | STENCH | GLITTER | BUMP | SCREAM) with Perception's field names."""
+    __slots__ = ()
+
+    breeze = property(lambda self: bool(self & BREEZE))
+    stench = property(lambda self: bool(self & STENCH))
+    glitter = property(lambda self: bool(self & GLITTER))
+    bump = property(lambda self: bool(self & BUMP))
+    scream = property(lambda self: bool(self & SCREAM))
+
+    @classmethod
+    def of(cls, perception) -> 'Percept':
+        """The shared Percept for a Perception, a Percept or a plain mask."""
+        if isinstance(perception, int):
+            return PERCEPTS[perception]
+        return PERCEPTS[(BREEZE if perception.breeze else 0) | (STENCH if perception.stench else 0)
+                        | (GLITTER if perception.glitter else 0) | (BUMP if perception.bump else 0)
+                        | (SCREAM if perception.scream else 0)]
+
+    def to_perception(self) -> 'Perception':
+        from schemas import Perception
+        return Perception(breeze=self.breeze, stench=self.stench, glitter=self.glitter, bump=self.bump,
+                          scream=self.scream)
+
+    def __repr__(self):
+        names = [name for name in ('breeze', 'stench', 'glitter', 'bump', 'scream') if getattr(self, name)]
+        return f"Percept({'|'.join(names) or 'none'})"
+
+# One shared instance per mask, so percept lookups never allocate
+PERCEPTS = [Percept(mask) for mask in range(32)]
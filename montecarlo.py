@@ -0,0 +1,186 @@
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from bitboard import BitBoard
+from environment import WumpusEnvironment, WUMPUS, PIT, GOLD
+
+# AIDEV-NOTE: rollouts score with EnhancedAgent.update_position itself. Its GRAB pays +1000 anywhere, so
+# GRAB is never a root action - decide() already grabs on glitter and choose_action keeps that - and
+# rollouts are played by decide(), which only grabs on glitter too. Keep it that way or the planner
+# learns to grab at the entrance and climb out.
+ROOT_MOVES = {(1, 0): "MOVE_EAST", (0, 1): "MOVE_NORTH", (-1, 0): "MOVE_WEST", (0, -1): "MOVE_SOUTH"}
+
+Stats = Dict[str, Tuple[int, int]]  # action -> (rollouts, total score change)
+
+
+class CaveSampler:
+    """
+    Draws caves uniformly from those consistent with what an agent has observed: no pit or Wumpus
+    in a visited room, a pit next to every breeze and none next to a breeze-free visited room,
+    the same for the Wumpus and stenches, `pits` pits, one Wumpus (none once it screamed) and
+    the gold in an unvisited room. Rejection sampling: features are drawn from the rooms each
+    may occupy, and draws that miss a breeze or share a room are thrown away.
+    """
+
+    def __init__(self, agent, max_tries: int = 10_000):
+        self.size = agent.size
+        self.max_tries = max_tries
+        self.pits = agent.pits
+        visited = agent.visited
+        start = BitBoard(self.size, [(1, 1)])
+        blocked = visited | start
+        self.pit_rooms = list((blocked | (visited - agent.breezy).neighbours()).complement())
+        self.breezes = [set(BitBoard(self.size, [cell]).neighbours()) for cell in agent.breezy]
+        self.wumpus_rooms: List[Tuple[int, int]] = []
+        if not agent.wumpus_dead:
+            possible = (blocked | (visited - agent.stenchy).neighbours()).complement()
+            for cell in agent.stenchy:
+                possible &= BitBoard(self.size, [cell]).neighbours()
+            self.wumpus_rooms = list(possible)
+        self.gold_rooms = [] if agent.has_gold else list(blocked.complement())
+
+    def sample(self, rng: random.Random, deadline: Optional[float] = None) -> Optional[bytes]:
+        """
+        One consistent cave as WumpusEnvironment.cave_bytes(), or None if max_tries draws all failed
+        or perf_counter() passed `deadline` first.
+        """
+        size = self.size
+        pits = min(self.pits, len(self.pit_rooms))
+        for tries in range(self.max_tries):
+            if deadline is not None and tries % 64 == 63 and time.perf_counter() >= deadline:
+                return None
+            placed = set(rng.sample(self.pit_rooms, pits))
+            if not all(breeze & placed for breeze in self.breezes):
+                continue
+            wumpus = rng.choice(self.wumpus_rooms) if self.wumpus_rooms else None
+            if wumpus in placed:
+                continue
+            gold = None
+            if self.gold_rooms:
+                gold = rng.choice(self.gold_rooms)
+                if gold in placed or gold == wumpus:
+                    continue
+            cave = bytearray(size * size)
+            for x, y in placed:
+                cave[(y - 1) * size + x - 1] = PIT
+            if wumpus is not None:
+                cave[(wumpus[1] - 1) * size + wumpus[0] - 1] = WUMPUS
+            if gold is not None:
+                cave[(gold[1] - 1) * size + gold[0] - 1] = GOLD
+            return bytes(cave)
+        return None
+
+
+def root_actions(agent) -> List[str]:
+    actions = [action for (dx, dy), action in ROOT_MOVES.items()
+               if 1 <= agent.x + dx <= agent.size and 1 <= agent.y + dy <= agent.size]
+    if agent.arrow:
+        actions.append("SHOOT")
+    if (agent.x, agent.y) == (1, 1):
+        actions.append("CLIMB")
+    return actions
+
+
+def rollout(agent, action: str, cave: bytes, depth: int, deadline: Optional[float] = None) -> Optional[int]:
+    """
+    Score change from playing `action`, then the agent's own rules, in `cave` for at most `depth` steps;
+    None if perf_counter() passed `deadline` before the rollout finished.
+    """
+    agent = agent.clone()
+    env = WumpusEnvironment(agent.size, cave=cave)
+    before = agent.performance
+    bump, scream, died, _, climbed_out = agent.update_position(action, env)
+    for _ in range(depth - 1):
+        if died or climbed_out:
+            break
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        next_action = agent.decide(env.percept(agent.x, agent.y), bump, scream)
+        bump, scream, died, _, climbed_out = agent.update_position(next_action, env)
+    return agent.performance - before
+
+
+def search(agent, actions: List[str], budget: float, depth: int, seed) -> Stats:
+    """
+    Sampled rollouts until `budget` seconds have passed. Each round draws one cave and plays every
+    action in it, so actions are compared on the same caves. The deadline is checked while sampling
+    and rolling out, so a search overruns it by at most one agent step; a rollout cut short is
+    dropped, and a search that finishes no rollout returns empty stats (the caller's default wins).
+    """
+    deadline = time.perf_counter() + budget
+    rng = random.Random(seed)
+    sampler = CaveSampler(agent)
+    stats = {action: (0, 0) for action in actions}
+    while True:
+        cave = sampler.sample(rng, deadline)
+        if cave is None:
+            return stats
+        for action in actions:
+            score = rollout(agent, action, cave, depth, deadline)
+            if score is None:
+                return stats
+            n, total = stats[action]
+            stats[action] = (n + 1, total + score)
+
+
+def _search_task(args) -> Stats:
+    return search(*args)
+
+
+class MonteCarloPlanner:
+    """
+    Anytime planner for EnhancedAgent(planner=...): each move, caves consistent with the agent's
+    knowledge are sampled and every root action is scored by rollouts of the agent's own rules
+    until `budget` seconds are up. With workers > 1, each worker process searches independently
+    (root parallelization) and their rollout totals are summed before picking the best mean.
+    """
+
+    def __init__(self, budget: float = 0.05, workers: int = 1, depth: int = 200, seed=None):
+        self.budget = budget
+        self.workers = workers or os.process_cpu_count() or 1
+        self.depth = depth
+        self.rng = random.Random(seed)
+        self.pool = None
+        self.last: Stats = {}
+
+    def __getstate__(self):
+        # Shipped to runner workers inside agent_kwargs; each process starts its own pool
+        state = self.__dict__.copy()
+        state['pool'] = None
+        return state
+
+    def choose(self, agent, default: str) -> str:
+        """Best action by mean rollout score; `default` (the rule cascade's pick) wins ties and fallbacks."""
+        actions = root_actions(agent)
+        if default not in actions:
+            actions.append(default)
+        root = agent.clone()
+        if self.workers > 1:
+            root.belief_cache = root.transpositions = root.zobrist = None
+        seeds = [self.rng.getrandbits(64) for _ in range(self.workers)]
+        if self.workers == 1:
+            totals = search(root, actions, self.budget, self.depth, seeds[0])
+        else:
+            if self.pool is None:
+                from multiprocessing import Pool
+                self.pool = Pool(processes=self.workers)
+            totals = {action: (0, 0) for action in actions}
+            tasks = [(root, actions, self.budget, self.depth, seed) for seed in seeds]
+            for stats in self.pool.imap_unordered(_search_task, tasks):
+                for action, (n, total) in stats.items():
+                    n0, total0 = totals[action]
+                    totals[action] = (n0 + n, total0 + total)
+        self.last = totals
+        best, best_mean = default, None
+        for action, (n, total) in totals.items():
+            if n and (best_mean is None or total / n > best_mean or (total / n == best_mean and action == default)):
+                best, best_mean = action, total / n
+        return best
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
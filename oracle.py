@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from corpus import CaveCorpus
+from environment import WumpusEnvironment, WUMPUS, PIT, GOLD, WALL
+from models import Direction
+
+# AIDEV-NOTE: mirrors EnhancedAgent.update_position scoring: move -1, shoot -10, GRAB +1000, death -1000,
+# climbing out without gold -1. Two quirks of update_position are handled deliberately:
+# - the agent never turns, so its arrow always flies along env direction Direction.EAST.value
+#   (north, since env.shoot reads 0=E 1=N 2=W 3=S); the oracle shoots the same way.
+# - GRAB is not checked against the room, but the agent only grabs on glitter; the oracle only
+#   grabs in the gold room too, otherwise "grab at (1, 1) and climb" would always score 1000.
+# Update both sides if either changes.
+ARROW_DELTA = [(1, 0), (0, 1), (-1, 0), (0, -1)][Direction.EAST.value]
+MOVE_COST, SHOOT_COST, GOLD_REWARD, CLIMB_EMPTY_HANDED = 1, 10, 1000, -1
+
+Optimum = Tuple[int, str, int]  # best score, plan, steps
+
+
+def cave_hash(size: int, cave) -> str:
+    """Hash of a cave's size and cell codes (as in WumpusEnvironment.cave_bytes / CaveCorpus.cave)."""
+    return hashlib.blake2b(size.to_bytes(2, 'little') + bytes(cave), digest_size=16).hexdigest()
+
+
+def _distances(env: WumpusEnvironment, start: int, wumpus_dead: bool) -> Dict[int, int]:
+    """BFS move counts from flat index `start` over rooms without a pit (or a live Wumpus)."""
+    cells = env.cells
+    blocked = (WALL, PIT) if wumpus_dead else (WALL, PIT, WUMPUS)
+    dist = {start: 0}
+    queue = deque([start])
+    steps = (1, -1, env.stride, -env.stride)
+    while queue:
+        i = queue.popleft()
+        d = dist[i] + 1
+        for step in steps:
+            j = i + step
+            if j not in dist and cells[j] not in blocked:
+                dist[j] = d
+                queue.append(j)
+    return dist
+
+
+def _shot_cells(env: WumpusEnvironment, wumpus: int) -> List[int]:
+    """Rooms from which the agent's arrow would hit the Wumpus (arrows fly over pits)."""
+    step = ARROW_DELTA[1] * env.stride + ARROW_DELTA[0]
+    out = []
+    i = wumpus - step
+    while env.cells[i] != WALL:
+        if env.cells[i] != PIT:
+            out.append(i)
+        i -= step
+    return out
+
+
+def optimal_score(env: WumpusEnvironment) -> Optimum:
+    """
+    Best achievable score with full knowledge of the cave: climb straight out, or fetch the gold
+    along a shortest safe route, possibly shooting the Wumpus (before or after the grab) to open
+    its room. Returns (score, plan, steps), plan being 'climb', 'gold', 'shoot_then_gold' or
+    'gold_then_shoot', and steps counting every action including GRAB and CLIMB.
+    """
+    start = env.index(1, 1)
+    gold = env.cells.find(GOLD)
+    wumpus = env.cells.find(WUMPUS)
+    best: Optimum = (CLIMB_EMPTY_HANDED, 'climb', 1)
+    if gold < 0:
+        return best
+    alive_from_start = _distances(env, start, wumpus_dead=False)
+    candidates = []
+    if gold in alive_from_start:
+        d = alive_from_start[gold]
+        candidates.append((2 * d * MOVE_COST, 'gold', 2 * d))
+    if wumpus >= 0:
+        alive_from_gold = _distances(env, gold, wumpus_dead=False)
+        dead_from_start = _distances(env, start, wumpus_dead=True)
+        dead_from_gold = _distances(env, gold, wumpus_dead=True)
+        for s in _shot_cells(env, wumpus):
+            # Walk to s, shoot, then fetch the gold and come back through the opened room
+            if s in alive_from_start and s in dead_from_gold and gold in dead_from_start:
+                moves = alive_from_start[s] + dead_from_gold[s] + dead_from_start[gold]
+                candidates.append((moves * MOVE_COST + SHOOT_COST, 'shoot_then_gold', moves + 1))
+            # Grab first, then shoot on the way home
+            if gold in alive_from_start and s in alive_from_gold and s in dead_from_start:
+                moves = alive_from_start[gold] + alive_from_gold[s] + dead_from_start[s]
+                candidates.append((moves * MOVE_COST + SHOOT_COST, 'gold_then_shoot', moves + 1))
+    for cost, plan, steps in candidates:
+        score = GOLD_REWARD - cost
+        if score > best[0]:
+            best = (score, plan, steps + 2)  # + GRAB + CLIMB
+    return best
+
+
+class OracleCache:
+    """Optimal scores keyed by cave_hash, pickled to `path` like BeliefCache."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.entries: Dict[str, Optimum] = {}
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                self.entries = pickle.load(f)
+
+    def optimum(self, env: WumpusEnvironment) -> Optimum:
+        key = cave_hash(env.size, env.cave_bytes())
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            result = self.entries[key] = optimal_score(env)
+        else:
+            self.hits += 1
+        return result
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self.entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+
+def _solve_chunk(args) -> List[Tuple[int, Optimum]]:
+    path, indices = args
+    with CaveCorpus(path) as corpus:
+        return [(index, optimal_score(corpus.environment(index))) for index in indices]
+
+
+def solve_corpus(path: str, cache: Optional[OracleCache] = None, workers: Optional[int] = None,
+                 chunk_size: int = 10_000) -> List[Tuple[int, str, Optimum]]:
+    """
+    (index, cave hash, optimum) for every cave of a corpus, in index order. Caves are hashed
+    straight from the map; only those missing from `cache` are solved, across a process pool.
+    """
+    cache = cache if cache is not None else OracleCache()
+    with CaveCorpus(path) as corpus:
+        keys = [cave_hash(corpus.size, cave) for cave in corpus]
+    missing = []
+    for index, key in enumerate(keys):
+        if key in cache.entries:
+            cache.hits += 1
+        else:
+            cache.misses += 1
+            missing.append(index)
+    tasks = [(path, missing[start:start + chunk_size]) for start in range(0, len(missing), chunk_size)]
+    workers = workers or os.process_cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        chunks = list(map(_solve_chunk, tasks))
+    else:
+        from multiprocessing import Pool
+        with Pool(processes=workers) as pool:
+            chunks = list(pool.imap_unordered(_solve_chunk, tasks))
+    for chunk in chunks:
+        for index, optimum in chunk:
+            cache.entries[keys[index]] = optimum
+    return [(index, key, cache.entries[key]) for index, key in enumerate(keys)]
+
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Best achievable score for every cave of a corpus.")
+    parser.add_argument('corpus', help="Corpus file (see corpus.py)")
+    parser.add_argument('-o', '--out', default=None, metavar='FILE', help="Write one JSON line per cave")
+    parser.add_argument('--cache', default=None, metavar='FILE', help="Load and save optima by cave hash")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cache = OracleCache(args.cache)
+    rows = solve_corpus(args.corpus, cache, args.workers)
+    if args.cache:
+        cache.save()
+    if args.out:
+        with open(args.out, 'w') as f:
+            for index, key, (score, plan, steps) in rows:
+                f.write(json.dumps({'cave': index, 'hash': key, 'optimal': score, 'plan': plan, 'steps': steps}) + '\n')
+    plans: Dict[str, int] = {}
+    for _, _, (_, plan, _) in rows:
+        plans[plan] = plans.get(plan, 0) + 1
+    mean = sum(score for _, _, (score, _, _) in rows) / len(rows) if rows else 0.0
+    print(f"Caves:         {len(rows)}")
+    print(f"Mean optimum:  {mean:.2f}")
+    print(f"Plans:         {dict(sorted(plans.items()))}")
+    print(f"Cache:         {cache.hits} hits, {cache.misses} misses")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
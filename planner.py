@@ -0,0 +1,114 @@
+from collections import deque
+from time import perf_counter
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+Cell = Tuple[int, int]
+
+
+class DistanceField:
+    """
+    BFS distances from a set of goal cells, expanding only through passable cells.
+    Adding a passable cell only ever shortens distances, so add_passable relaxes outward from
+    that cell instead of re-running the search; anything else calls rebuild().
+    With `stats` (an instrumentation.AgentStats), every rebuild and relaxation is recorded as a
+    'distance_field' search.
+    """
+
+    def __init__(self, goals: Iterable[Cell], passable: Callable[[Cell], bool],
+                 neighbors: Callable[[Cell], Iterable[Cell]], stats=None):
+        self.goals = set(goals)
+        self.passable = passable
+        self.neighbors = neighbors
+        self.stats = stats
+        self.dist: Dict[Cell, int] = {}
+        self.rebuild()
+
+    def rebuild(self):
+        start = perf_counter() if self.stats is not None else 0.0
+        self.dist = {goal: 0 for goal in self.goals if self.passable(goal)}
+        expanded = self._propagate(deque(self.dist))
+        if self.stats is not None:
+            self.stats.record_search('distance_field', expanded, perf_counter() - start)
+
+    def _propagate(self, queue: deque) -> int:
+        """Relaxes outward from the queued cells; returns how many cells were expanded."""
+        dist = self.dist
+        expanded = 0
+        while queue:
+            cell = queue.popleft()
+            expanded += 1
+            nd = dist[cell] + 1
+            for n in self.neighbors(cell):
+                if (n not in dist or nd < dist[n]) and self.passable(n):
+                    dist[n] = nd
+                    queue.append(n)
+        return expanded
+
+    def add_passable(self, cell: Cell):
+        if not self.passable(cell):
+            return
+        start = perf_counter() if self.stats is not None else 0.0
+        best = 0 if cell in self.goals else min(
+            (self.dist[n] + 1 for n in self.neighbors(cell) if n in self.dist), default=None)
+        if best is not None and best < self.dist.get(cell, best + 1):
+            self.dist[cell] = best
+            expanded = self._propagate(deque([cell]))
+            if self.stats is not None:
+                self.stats.record_search('distance_field', expanded, perf_counter() - start)
+
+    def next_step(self, pos: Cell) -> Optional[Cell]:
+        """
+        Neighbour of pos one step closer to the nearest goal, or None if pos is a goal or cut off.
+        Ties go to the last neighbour in `neighbors` order.
+        """
+        here = self.dist.get(pos)
+        best = best_d = None
+        for n in self.neighbors(pos):
+            d = self.dist.get(n)
+            if d is not None and (here is None or d < here) and (best_d is None or d <= best_d):
+                best, best_d = n, d
+        return best
+
+
+def nearest_step(pos: Cell, is_goal: Callable[[Cell], bool], passable: Callable[[Cell], bool],
+                 neighbors: Callable[[Cell], Iterable[Cell]], stats=None) -> Optional[Cell]:
+    """
+    Same answer as DistanceField(goals, passable, neighbors).next_step(pos), found by a BFS outward
+    from pos that stops after the level holding the nearest goal. Costs grow with the distance to
+    that goal, not with the number of passable cells, so it suits goal sets that change every step.
+    Every cell remembers which first steps (bits in `neighbors(pos)` order) reach it on a shortest
+    path; the last first step reaching a goal on the nearest level wins, matching next_step's ties.
+    With `stats`, the search is recorded as a 'nearest_step' search of the cells whose neighbours it scanned.
+    """
+    if is_goal(pos) and passable(pos):
+        return None
+    start = perf_counter() if stats is not None else 0.0
+    expanded = 1
+    step = None
+    first = list(neighbors(pos))
+    seen = {pos}
+    level: Dict[Cell, int] = {}
+    for bit, n in enumerate(first):
+        if passable(n):
+            level[n] = 1 << bit
+    while level:
+        reached = 0
+        for cell, mask in level.items():
+            if is_goal(cell):
+                reached |= mask
+        if reached:
+            step = first[reached.bit_length() - 1]
+            break
+        expanded += len(level)
+        seen.update(level)
+        following: Dict[Cell, int] = {}
+        for cell, mask in level.items():
+            for n in neighbors(cell):
+                if n in following:
+                    following[n] |= mask
+                elif n not in seen and passable(n):
+                    following[n] = mask
+        level = following
+    if stats is not None:
+        stats.record_search('nearest_step', expanded, perf_counter() - start)
+    return step
@@ -0,0 +1,418 @@
+import json
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from agent import EnhancedAgent
+from belief_cache import BeliefCache
+from corpus import CaveCorpus, episode_seed
+from environment import WumpusEnvironment
+from episode_trace import EpisodeRecorder, TraceWriter, merge_traces
+from generator import add_generator_arguments, generator_from_args
+from instrumentation import AgentStats
+from oracle import OracleCache
+from transposition import TranspositionTable
+from models import BUMP, SCREAM
+
+# AIDEV-NOTE: headless path - must never import pygame (or main.py), workers spawn it per process.
+# pydantic, argparse and multiprocessing stay out of import time too; see bench.py startup for the budget.
+
+
+class BatchResult:
+    # A plain class rather than a pydantic model or dataclass: both cost more to import than a worker saves
+    def __init__(self):
+        self.episodes = 0
+        self.wins = 0
+        self.total_score = 0
+        self.total_steps = 0
+        self.min_score: Optional[int] = None
+        self.max_score: Optional[int] = None
+        self.outcomes: Dict[str, int] = {}
+        self.belief_cache_hits = 0
+        self.belief_cache_misses = 0
+        self.transposition_hits = 0
+        self.transposition_misses = 0
+        # AgentStats.to_dict() of every agent, when instrumented
+        self.agent_stats: Optional[dict] = None
+        # Oracle comparison: sum of per-cave optimal scores, episodes that matched it, and
+        # optionally one (episode index, score, optimal score) row per episode
+        self.oracle_episodes = 0
+        self.total_optimal = 0
+        self.optimal_matches = 0
+        self.regrets: Optional[List[Tuple[int, int, int]]] = None
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.episodes if self.episodes else 0.0
+
+    @property
+    def mean_score(self) -> float:
+        return self.total_score / self.episodes if self.episodes else 0.0
+
+    @property
+    def mean_steps(self) -> float:
+        return self.total_steps / self.episodes if self.episodes else 0.0
+
+    @property
+    def deaths(self) -> Dict[str, int]:
+        return {k: self.outcomes.get(k, 0) for k in ('pit', 'wumpus')}
+
+    def add(self, score: int, steps: int, outcome: str):
+        self.episodes += 1
+        self.total_score += score
+        self.total_steps += steps
+        if outcome == 'escaped':
+            self.wins += 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.min_score = score if self.min_score is None else min(self.min_score, score)
+        self.max_score = score if self.max_score is None else max(self.max_score, score)
+
+    def add_regret(self, index: int, score: int, optimal: int, keep_row: bool = False):
+        self.oracle_episodes += 1
+        self.total_optimal += optimal
+        if score >= optimal:
+            self.optimal_matches += 1
+        if keep_row:
+            if self.regrets is None:
+                self.regrets = []
+            self.regrets.append((index, score, optimal))
+
+    def merge(self, other: 'BatchResult'):
+        self.episodes += other.episodes
+        self.wins += other.wins
+        self.total_score += other.total_score
+        self.total_steps += other.total_steps
+        self.belief_cache_hits += other.belief_cache_hits
+        self.belief_cache_misses += other.belief_cache_misses
+        self.transposition_hits += other.transposition_hits
+        self.transposition_misses += other.transposition_misses
+        self.oracle_episodes += other.oracle_episodes
+        self.total_optimal += other.total_optimal
+        self.optimal_matches += other.optimal_matches
+        if other.regrets is not None:
+            self.regrets = (self.regrets or []) + other.regrets
+        if other.agent_stats is not None:
+            if self.agent_stats is None:
+                self.agent_stats = other.agent_stats
+            else:
+                stats = AgentStats.from_dict(self.agent_stats)
+                stats.merge(AgentStats.from_dict(other.agent_stats))
+                self.agent_stats = stats.to_dict()
+        for outcome, count in other.outcomes.items():
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + count
+        for score in (other.min_score, other.max_score):
+            if score is not None:
+                self.min_score = score if self.min_score is None else min(self.min_score, score)
+                self.max_score = score if self.max_score is None else max(self.max_score, score)
+
+    def summary(self) -> dict:
+        summary = {
+            'episodes': self.episodes,
+            'wins': self.wins,
+            'win_rate': self.win_rate,
+            'mean_score': self.mean_score,
+            'min_score': self.min_score,
+            'max_score': self.max_score,
+            'mean_steps': self.mean_steps,
+            'deaths': self.deaths,
+            'outcomes': dict(sorted(self.outcomes.items())),
+        }
+        lookups = self.belief_cache_hits + self.belief_cache_misses
+        if lookups:
+            summary['belief_cache'] = {'hits': self.belief_cache_hits, 'misses': self.belief_cache_misses,
+                                       'hit_rate': self.belief_cache_hits / lookups}
+        lookups = self.transposition_hits + self.transposition_misses
+        if lookups:
+            summary['transpositions'] = {'hits': self.transposition_hits, 'misses': self.transposition_misses,
+                                         'hit_rate': self.transposition_hits / lookups}
+        if self.oracle_episodes:
+            # Only meaningful when every episode was compared, which run_batch guarantees
+            mean_optimal = self.total_optimal / self.oracle_episodes
+            summary['oracle'] = {'mean_optimal': mean_optimal, 'mean_regret': mean_optimal - self.mean_score,
+                                 'optimal_matches': self.optimal_matches}
+        return summary
+
+
+def run_episode(seed=None, max_steps: int = 1000, agent_kwargs=None, size: int = 4,
+                trace: Optional[TraceWriter] = None, cave=None, generator=None) -> Tuple[int, int, str]:
+    """
+    Plays one episode without rendering, the way WumpusGame.run does on repeated SPACE presses.
+    Returns (score, steps, outcome) where outcome is one of
+    'escaped', 'climbed', 'pit', 'wumpus' or 'timeout'.
+    The cave is generated from `seed` (by `generator`, a generator.CaveGenerator, if given),
+    or loaded from `cave` (e.g. CaveCorpus.cave(i)).
+    With `trace`, the cave and every step are appended to it as one packed episode.
+    """
+    env = WumpusEnvironment(size, seed=seed, cave=cave, generator=generator)
+    agent = EnhancedAgent(size=size, **(agent_kwargs or {}))
+    recorder = EpisodeRecorder(env) if trace is not None else None
+    score, steps, outcome = agent.performance, max_steps, 'timeout'
+    bump = scream = False
+    for step in range(1, max_steps + 1):
+        perception = env.percept(agent.x, agent.y)
+        action = agent.choose_action(perception, bump, scream)
+        before = agent.performance
+        bump, scream, died, death_type, climbed_out = agent.update_position(action, env)
+        if recorder is not None:
+            bits = env.percept_bits(agent.x, agent.y) | (BUMP if bump else 0) | (SCREAM if scream else 0)
+            recorder.record(agent.x, agent.y, action, bits, agent.performance - before)
+        if died or climbed_out:
+            steps = step
+            outcome = death_type if died else 'escaped' if agent.has_gold else 'climbed'
+            break
+    score = agent.performance
+    if recorder is not None:
+        trace.write_episode(recorder.finish(score, outcome))
+    return score, steps, outcome
+
+
+# One BeliefCache and one corpus map per process, shared by every agent the process runs
+_belief_cache: Optional[BeliefCache] = None
+_corpus: Optional[CaveCorpus] = None
+_oracle_cache: Optional[OracleCache] = None
+_transpositions: Optional[TranspositionTable] = None
+
+
+def _process_belief_cache(maxsize: int, path: Optional[str]) -> BeliefCache:
+    global _belief_cache
+    if _belief_cache is None:
+        _belief_cache = BeliefCache(maxsize, path)
+    return _belief_cache
+
+
+def _process_corpus(path: str) -> CaveCorpus:
+    global _corpus
+    if _corpus is None or _corpus.path != path:
+        _corpus = CaveCorpus(path)
+    return _corpus
+
+
+def _process_oracle_cache() -> OracleCache:
+    global _oracle_cache
+    if _oracle_cache is None:
+        _oracle_cache = OracleCache()
+    return _oracle_cache
+
+
+def _process_transpositions(slots: int, name: Optional[str]) -> TranspositionTable:
+    """The process's table: its own, or the run's shared-memory table when `name` is given."""
+    global _transpositions
+    if _transpositions is None:
+        _transpositions = TranspositionTable.attach(name, slots) if name else TranspositionTable(slots)
+    return _transpositions
+
+
+def _run_chunk(args) -> BatchResult:
+    seed, start, count, settings = args
+    agent_kwargs = dict(settings['agent_kwargs'] or {})
+    cache = None
+    if settings['belief_cache']:
+        cache = agent_kwargs['belief_cache'] = _process_belief_cache(*settings['belief_cache'])
+        hits, misses = cache.hits, cache.misses
+    table = None
+    if settings['transpositions']:
+        table = agent_kwargs['transpositions'] = _process_transpositions(*settings['transpositions'])
+        table_hits, table_misses = table.hits, table.misses
+    stats = None
+    if settings['instrument']:
+        stats = agent_kwargs['stats'] = AgentStats()
+    result = BatchResult()
+    # Each chunk traces to its own part file; run_batch stitches them together in episode order
+    trace = TraceWriter(_trace_part(settings['trace'], start)) if settings['trace'] else None
+    corpus = _process_corpus(settings['corpus']) if settings['corpus'] else None
+    oracle = _process_oracle_cache() if settings['oracle'] else None
+    for index in range(start, start + count):
+        if corpus is not None:
+            score, steps, outcome = run_episode(None, settings['max_steps'], agent_kwargs, corpus.size, trace,
+                                                corpus.cave(index))
+        else:
+            score, steps, outcome = run_episode(episode_seed(seed, index), settings['max_steps'], agent_kwargs,
+                                                settings['size'], trace, generator=settings['generator'])
+        result.add(score, steps, outcome)
+        if oracle is not None:
+            env = (corpus.environment(index) if corpus is not None
+                   else WumpusEnvironment(settings['size'], seed=episode_seed(seed, index),
+                                          generator=settings['generator']))
+            optimal, _, _ = oracle.optimum(env)
+            result.add_regret(index, score, optimal, settings['oracle'] == 'rows')
+    if trace is not None:
+        trace.close()
+    if cache is not None:
+        result.belief_cache_hits = cache.hits - hits
+        result.belief_cache_misses = cache.misses - misses
+    if table is not None:
+        result.transposition_hits = table.hits - table_hits
+        result.transposition_misses = table.misses - table_misses
+    if stats is not None:
+        result.agent_stats = stats.to_dict()
+    return result
+
+
+def _trace_part(path: str, start: int) -> str:
+    return f"{path}.{start:012d}.part"
+
+
+def _chunks(episodes: int, chunk_size: int, seed: int, settings: dict) -> Iterator[tuple]:
+    for start in range(0, episodes, chunk_size):
+        yield seed, start, min(chunk_size, episodes - start), settings
+
+
+def run_batch(episodes: int, workers: Optional[int] = None, seed: int = 0, chunk_size: Optional[int] = None,
+              max_steps: int = 1000, agent_kwargs=None, size: int = 4, belief_cache: Optional[int] = None,
+              belief_cache_file: Optional[str] = None, trace: Optional[str] = None,
+              instrument: bool = False, corpus: Optional[str] = None, oracle: Optional[str] = None,
+              transpositions: Optional[int] = None, shared_transpositions: bool = False,
+              generator=None) -> BatchResult:
+    """
+    Runs `episodes` independent episodes across a process pool and aggregates the results.
+    Episode i always plays the cave seeded by (seed, i), so results are reproducible for any
+    worker count or chunk size. Workers return one aggregated BatchResult per chunk.
+    With `belief_cache` (an LRU size) every process shares one BeliefCache across its agents;
+    `belief_cache_file` warm-starts it, and is written back when running in-process (workers=1).
+    With `trace`, every episode is recorded to that episode trace file, in episode order.
+    With `instrument`, agents record AgentStats, returned merged in BatchResult.agent_stats.
+    With `corpus` (a corpus.py file), episode i plays stored cave i instead of generating one;
+    `seed` and `size` are then ignored.
+    With `oracle` ('summary' or 'rows'), every cave's optimal score (oracle.py) is compared with
+    the agent's; 'rows' also returns per-episode (index, score, optimal) rows in BatchResult.regrets.
+    With `generator` (a generator.CaveGenerator), generated caves come from it instead of init_grid.
+    With `transpositions` (a power-of-two slot count) agents reuse decisions through a
+    TranspositionTable per process, or one table in shared memory with `shared_transpositions`.
+    """
+    if corpus:
+        with CaveCorpus(corpus) as stored:
+            if episodes > len(stored):
+                raise ValueError(f"{corpus} holds {len(stored)} caves, {episodes} episodes requested")
+    workers = workers or os.process_cpu_count() or 1
+    if chunk_size is None:
+        # Enough chunks per worker to balance load, few enough to keep IPC negligible
+        chunk_size = max(1, min(10_000, episodes // (workers * 8) or 1))
+    total = BatchResult()
+    settings = {'max_steps': max_steps, 'agent_kwargs': agent_kwargs, 'size': size,
+                'belief_cache': (belief_cache, belief_cache_file) if belief_cache else None, 'trace': trace,
+                'instrument': instrument, 'corpus': corpus, 'oracle': oracle, 'transpositions': None,
+                'generator': generator}
+    shared = None
+    if transpositions:
+        if shared_transpositions and workers > 1:
+            shared = TranspositionTable.create_shared(transpositions)
+        settings['transpositions'] = (transpositions, shared.name if shared is not None else None)
+    tasks = _chunks(episodes, chunk_size, seed, settings)
+    if workers == 1:
+        for task in tasks:
+            total.merge(_run_chunk(task))
+        if belief_cache and belief_cache_file:
+            _process_belief_cache(belief_cache, belief_cache_file).save()
+    else:
+        from multiprocessing import Pool
+        with Pool(processes=workers) as pool:
+            for partial in pool.imap_unordered(_run_chunk, tasks):
+                total.merge(partial)
+        if shared is not None:
+            shared.close(unlink=True)
+    if total.regrets is not None:
+        total.regrets.sort()
+    if trace:
+        merge_traces(trace, [_trace_part(trace, start) for start in range(0, episodes, chunk_size)])
+    return total
+
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Run EnhancedAgent episodes headlessly in parallel.")
+    parser.add_argument('-n', '--episodes', type=int, default=10_000)
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('--size', type=int, default=4, help="Cave width and height")
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument('--max-steps', type=int, default=1000)
+    parser.add_argument('--risk-prob', type=float, default=0.25)
+    parser.add_argument('--risk-threshold', type=int, default=5)
+    parser.add_argument('--posteriors', action='store_true', help="Take risks by exact pit/Wumpus posterior")
+    parser.add_argument('--monte-carlo', type=float, default=None, metavar='SECONDS',
+                        help="Plan every move by sampled rollouts for this long (montecarlo.py)")
+    parser.add_argument('--mc-workers', type=int, default=1,
+                        help="Processes per --monte-carlo search (root parallelization; needs -w 1)")
+    parser.add_argument('--belief-cache', type=int, default=None, metavar='SIZE',
+                        help="Share an LRU cache of SIZE frontier enumerations per worker")
+    parser.add_argument('--belief-cache-file', default=None,
+                        help="Warm-start the belief cache from this file (written back when --workers 1)")
+    parser.add_argument('--transpositions', type=int, default=None, metavar='SLOTS',
+                        help="Reuse decisions for repeated knowledge states (SLOTS a power of two, e.g. 65536)")
+    parser.add_argument('--shared-transpositions', action='store_true',
+                        help="One transposition table in shared memory for all workers")
+    parser.add_argument('--trace', default=None, metavar='FILE',
+                        help="Record every episode to this binary trace (replay with main.py --replay)")
+    parser.add_argument('--corpus', default=None, metavar='FILE',
+                        help="Play the caves of this corpus (see corpus.py) instead of generating them")
+    parser.add_argument('--oracle', action='store_true', help="Report regret against each cave's optimal score")
+    parser.add_argument('--regret-out', default=None, metavar='FILE',
+                        help="Write one JSON line of score, optimum and regret per episode (implies --oracle)")
+    parser.add_argument('--stats', default=None, metavar='FILE',
+                        help="Instrument the agents and write their histograms to FILE")
+    parser.add_argument('--stats-format', choices=('json', 'openmetrics'), default='json')
+    parser.add_argument('--json', action='store_true', help="Print the summary as JSON")
+    add_generator_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.monte_carlo is not None and args.mc_workers != 1 and args.workers != 1:
+        # Pool workers are daemonic and cannot start a search pool of their own
+        parser.error("--mc-workers needs -w 1")
+    if args.transpositions is not None and (args.transpositions < 1 or args.transpositions & (args.transpositions - 1)):
+        parser.error("--transpositions must be a power of two")
+    if (args.oracle or args.regret_out) and (args.wumpuses not in (None, 1) or args.golds not in (None, 1)):
+        parser.error("--oracle solves caves with one Wumpus and one gold only")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    agent_kwargs = {'risk_prob': args.risk_prob, 'risk_threshold': args.risk_threshold,
+                    'use_posteriors': args.posteriors}
+    generator = generator_from_args(args)
+    if generator is not None:
+        # The posteriors assume a known pit count; with a density, expect the mean
+        agent_kwargs['pits'] = (generator.pits if generator.pit_density is None
+                                else round(generator.pit_density * (args.size * args.size - 1)))
+    if args.monte_carlo is not None:
+        from montecarlo import MonteCarloPlanner
+        agent_kwargs['planner'] = MonteCarloPlanner(args.monte_carlo, args.mc_workers, seed=args.seed)
+    result = run_batch(args.episodes, args.workers, args.seed, args.chunk_size, args.max_steps, agent_kwargs,
+                       args.size, args.belief_cache, args.belief_cache_file, args.trace, bool(args.stats), args.corpus,
+                       'rows' if args.regret_out else 'summary' if args.oracle else None,
+                       args.transpositions, args.shared_transpositions, generator)
+    if args.regret_out:
+        with open(args.regret_out, 'w') as f:
+            for index, score, optimal in result.regrets:
+                f.write(json.dumps({'episode': index, 'score': score, 'optimal': optimal,
+                                    'regret': optimal - score}) + '\n')
+    if args.stats:
+        stats = AgentStats.from_dict(result.agent_stats)
+        if args.stats_format == 'openmetrics':
+            stats.save_openmetrics(args.stats)
+        else:
+            stats.save_json(args.stats)
+    summary = result.summary()
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+        return
+    print(f"Episodes:   {summary['episodes']}")
+    print(f"Win rate:   {summary['win_rate']:.2%} ({summary['wins']} escaped with gold)")
+    print(f"Mean score: {summary['mean_score']:.2f} (min {summary['min_score']}, max {summary['max_score']})")
+    print(f"Mean steps: {summary['mean_steps']:.2f}")
+    print(f"Deaths:     pit {summary['deaths']['pit']}, wumpus {summary['deaths']['wumpus']}")
+    print(f"Outcomes:   {summary['outcomes']}")
+    if 'oracle' in summary:
+        oracle = summary['oracle']
+        print(f"Regret:     {oracle['mean_regret']:.2f} mean (optimum {oracle['mean_optimal']:.2f}, "
+              f"matched on {oracle['optimal_matches']} caves)")
+    if 'transpositions' in summary:
+        table = summary['transpositions']
+        print(f"Transpositions: {table['hit_rate']:.2%} hits ({table['hits']} hits, {table['misses']} misses)")
+    if 'belief_cache' in summary:
+        cache = summary['belief_cache']
+        print(f"Belief cache: {cache['hit_rate']:.2%} hits ({cache['hits']} hits, {cache['misses']} misses)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import List, Tuple, Set, Dict
+from models import Direction
+
+# Pydantic models for serialization and API boundaries; models.py re-exports them lazily
+
+class Position(BaseModel):
+    x: int
+    y: int
+
+class Perception(BaseModel):
+    breeze: bool = False
+    stench: bool = False
+    glitter: bool = False
+    bump: bool = False
+    scream: bool = False
+
+class GameState(BaseModel):
+    score: int = 0
+    has_arrow: bool = True
+    has_gold: bool = False
+    agent_pos: Position
+    agent_dir: Direction
+    known_pits: Set[Tuple[int, int]] = set()
+    known_wumpus: Set[Tuple[int, int]] = set()
+    visited: Set[Tuple[int, int]] = set()
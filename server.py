@@ -0,0 +1,263 @@
+import asyncio
+import json
+import os
+import sys
+from itertools import count
+from typing import Dict, Optional, Set
+
+from environment import WumpusEnvironment, EMPTY, WUMPUS, PIT, GOLD
+from models import BUMP, SCREAM, Direction
+
+# AIDEV-NOTE: newline-delimited JSON, one object per line each way. Every request carries a client-chosen
+# "id" that its response echoes, so clients may pipeline; responses come back in request order per
+# connection. Session.act mirrors EnhancedAgent.update_position scoring - update both together.
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MOVES = {'MOVE_EAST': 0, 'MOVE_NORTH': 1, 'MOVE_WEST': 2, 'MOVE_SOUTH': 3}  # env.move directions
+ACTIONS = (*MOVES, 'SHOOT', 'GRAB', 'CLIMB')
+# Pending response bytes per connection before the server waits for the client to read
+HIGH_WATER = 1 << 20
+# Largest cave a client may ask for; a cave's padded grid and percepts cost 2 * (size + 2) ** 2 bytes
+MAX_SIZE = 256
+
+
+class ServerError(Exception):
+    """A request the server rejected; the message is the response's "error"."""
+
+
+class Session:
+    """One cave and the agent body walking it, played by a remote client action by action."""
+
+    __slots__ = ('env', 'max_steps', 'x', 'y', 'arrow', 'has_gold', 'score', 'steps', 'outcome')
+
+    def __init__(self, env: WumpusEnvironment, max_steps: int = 1000):
+        self.env = env
+        self.max_steps = max_steps
+        self.x, self.y = 1, 1
+        self.arrow = True
+        self.has_gold = False
+        self.score = 0
+        self.steps = 0
+        self.outcome: Optional[str] = None  # as runner.run_episode, once the episode is over
+
+    def state(self, bump: bool = False, scream: bool = False) -> dict:
+        """Where the agent is and what it perceives there; percept holds models.BREEZE..SCREAM bits."""
+        bits = self.env.percept_bits(self.x, self.y) | (BUMP if bump else 0) | (SCREAM if scream else 0)
+        return {'x': self.x, 'y': self.y, 'percept': bits, 'score': self.score, 'steps': self.steps,
+                'outcome': self.outcome}
+
+    def act(self, action: str, direction: Optional[int] = None) -> dict:
+        """
+        Plays one action (see ACTIONS). SHOOT takes an env direction (0=E 1=N 2=W 3=S), by default
+        the one EnhancedAgent always faces. Unlike update_position, GRAB only pays off on the gold.
+        """
+        if self.outcome is not None:
+            raise ServerError(f"episode is over ({self.outcome})")
+        bump = scream = False
+        env = self.env
+        if action in MOVES:
+            self.x, self.y, bump = env.move(self.x, self.y, MOVES[action])
+            self.score -= 2 if bump else 1
+        elif action == 'SHOOT':
+            if self.arrow:
+                self.arrow = False
+                scream = env.shoot(self.x, self.y, Direction.EAST.value if direction is None else direction)
+                self.score -= 10
+        elif action == 'GRAB':
+            if not self.has_gold and env.cells[env.index(self.x, self.y)] == GOLD:
+                self.has_gold = True
+                self.score += 1000
+        elif action == 'CLIMB':
+            if (self.x, self.y) == (1, 1):
+                self.outcome = 'escaped' if self.has_gold else 'climbed'
+                if not self.has_gold:
+                    self.score -= 1
+        else:
+            raise ServerError(f"unknown action {action!r}")
+        self.steps += 1
+        cell = env.cells[env.index(self.x, self.y)]
+        if cell == PIT or cell == WUMPUS:
+            self.outcome = 'pit' if cell == PIT else 'wumpus'
+            self.score -= 1000
+        elif self.outcome is None and self.steps >= self.max_steps:
+            self.outcome = 'timeout'
+        return self.state(bump, scream)
+
+
+class GameServer:
+    """
+    Hosts sessions for any number of connections. A session belongs to the connection that
+    created it: other connections cannot see it, and it is dropped when that connection closes.
+    """
+
+    def __init__(self, max_sessions: int = 100_000):
+        self.max_sessions = max_sessions
+        self.sessions: Dict[int, Session] = {}
+        self.ids = count(1)
+        self.requests = 0
+        self.ops = {
+            'new': self.op_new, 'percept': self.op_percept, 'move': self.op_move, 'shoot': self.op_shoot,
+            'act': self.op_act, 'step': self.op_step, 'close': self.op_close, 'batch': self.op_batch,
+        }
+
+    def session(self, request: dict, owned: Set[int]) -> Session:
+        sid = request.get('session')
+        if not isinstance(sid, int) or sid not in owned:
+            raise ServerError(f"unknown session {sid!r}")
+        return self.sessions[sid]
+
+    def op_new(self, request: dict, owned: Set[int]) -> dict:
+        """{"size", "seed", "cave" (hex of WumpusEnvironment.cave_bytes()), "max_steps"}, all optional."""
+        if len(self.sessions) >= self.max_sessions:
+            raise ServerError(f"session limit ({self.max_sessions}) reached")
+        size = request.get('size', 4)
+        if type(size) is not int or not 2 <= size <= MAX_SIZE:
+            raise ServerError(f"size must be an integer from 2 to {MAX_SIZE}, got {size!r}")
+        cave = request.get('cave')
+        try:
+            cave = bytes.fromhex(cave) if cave is not None else None
+            if cave is not None and max(cave, default=EMPTY) > GOLD:
+                raise ValueError("cell codes are 0 (empty) to 3 (gold)")
+            env = WumpusEnvironment(size, seed=request.get('seed'), cave=cave)
+        except ValueError as e:
+            raise ServerError(f"bad cave: {e}")
+        sid = next(self.ids)
+        self.sessions[sid] = session = Session(env, request.get('max_steps', 1000))
+        owned.add(sid)
+        return {'session': sid, **session.state()}
+
+    def op_percept(self, request: dict, owned: Set[int]) -> dict:
+        return self.session(request, owned).state()
+
+    def op_move(self, request: dict, owned: Set[int]) -> dict:
+        direction = request.get('dir')
+        if direction not in (0, 1, 2, 3):
+            raise ServerError("move needs dir 0=E 1=N 2=W 3=S")
+        return self.session(request, owned).act(ACTIONS[direction])
+
+    def op_shoot(self, request: dict, owned: Set[int]) -> dict:
+        return self.session(request, owned).act('SHOOT', request.get('dir'))
+
+    def op_act(self, request: dict, owned: Set[int]) -> dict:
+        return self.session(request, owned).act(request.get('action'))
+
+    def op_step(self, request: dict, owned: Set[int]) -> dict:
+        """Plays a list of actions in one message, stopping early if the episode ends."""
+        session = self.session(request, owned)
+        states = []
+        for action in request.get('actions', ()):
+            states.append(session.act(action))
+            if session.outcome is not None:
+                break
+        return {'states': states}
+
+    def op_close(self, request: dict, owned: Set[int]) -> dict:
+        session = self.session(request, owned)
+        del self.sessions[request['session']]
+        owned.discard(request['session'])
+        return {'score': session.score, 'steps': session.steps, 'outcome': session.outcome}
+
+    def op_batch(self, request: dict, owned: Set[int]) -> dict:
+        """Any requests (for any of the connection's sessions) in one message; answers them in order. No nesting."""
+        responses = []
+        for sub in request.get('requests', ()):
+            if not isinstance(sub, dict) or sub.get('op') == 'batch':
+                responses.append({'error': "batch requests must be non-batch JSON objects"})
+            else:
+                responses.append(self.dispatch(sub, owned))
+        return {'responses': responses}
+
+    def dispatch(self, request: dict, owned: Set[int]) -> dict:
+        self.requests += 1
+        try:
+            handler = self.ops.get(request.get('op'))
+            if handler is None:
+                raise ServerError(f"unknown op {request.get('op')!r}")
+            response = handler(request, owned)
+        except ServerError as e:
+            response = {'error': str(e)}
+        except (TypeError, ValueError, KeyError) as e:
+            response = {'error': f"bad request: {e}"}
+        except Exception as e:
+            # One bad request must not take the connection, and every session it owns, down with it
+            response = {'error': f"internal error: {type(e).__name__}"}
+        if 'id' in request:
+            response['id'] = request['id']
+        return response
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Whole reads are parsed and answered with one write, so a pipelining client costs
+        # one syscall per burst rather than per request
+        owned: Set[int] = set()
+        pending = b''
+        try:
+            while data := await reader.read(1 << 16):
+                *lines, pending = (pending + data).split(b'\n')
+                out = []
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                        if not isinstance(request, dict):
+                            raise ValueError("request must be a JSON object")
+                    except (ValueError, RecursionError) as e:
+                        out.append(json.dumps({'error': f"bad request: {e}"}))
+                        continue
+                    response = self.dispatch(request, owned)
+                    try:
+                        out.append(json.dumps(response, separators=(',', ':')))
+                    except (TypeError, ValueError, RecursionError) as e:
+                        out.append(json.dumps({'error': f"bad request: {e}"}))
+                if out:
+                    out.append('')
+                    writer.write('\n'.join(out).encode())
+                    if writer.transport.get_write_buffer_size() > HIGH_WATER:
+                        await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for sid in owned:
+                self.sessions.pop(sid, None)
+            writer.close()
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: Optional[str] = None):
+        """Listens on a Unix socket at `path`, else on TCP host:port (port 0 picks a free one)."""
+        if path:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve Wumpus caves to remote agents over newline-delimited JSON.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('-p', '--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', default=None, metavar='PATH', help="Listen on a Unix socket instead of TCP")
+    parser.add_argument('--max-sessions', type=int, default=100_000)
+    return parser.parse_args(argv)
+
+
+async def serve(args):
+    server = GameServer(args.max_sessions)
+    listener = await server.start(args.host, args.port, args.unix)
+    where = args.unix or ', '.join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in listener.sockets)
+    print(f"Serving on {where}", file=sys.stderr)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
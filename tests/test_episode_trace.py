@@ -0,0 +1,28 @@
+from episode_trace import TraceReader, TraceWriter
+from runner import episode_seed, run_episode
+
+
+def write_trace(path, episodes=50):
+    with TraceWriter(str(path)) as writer:
+        for index in range(episodes):
+            run_episode(episode_seed(0, index), trace=writer)
+
+
+def test_iterating_inside_with_block_closes_cleanly(tmp_path):
+    path = tmp_path / 'trace.bin'
+    write_trace(path)
+    kept = []
+    with TraceReader(str(path)) as reader:
+        for episode in reader:
+            assert len(list(episode.iter_steps())) == len(episode)
+            kept.append(episode)
+    assert len(kept) == 50
+
+
+def test_episodes_match_replayed_scores(tmp_path):
+    path = tmp_path / 'trace.bin'
+    write_trace(path, 5)
+    with TraceReader(str(path)) as reader:
+        for index, episode in enumerate(reader):
+            score, steps, outcome = run_episode(episode_seed(0, index))
+            assert (episode.score, len(episode), episode.outcome) == (score, steps, outcome)
@@ -0,0 +1,140 @@
+import hashlib
+import random
+import struct
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from instrumentation import BRANCHES
+from knowledge_log import ACTIONS, ACTION_CODES
+
+# AIDEV-NOTE: a cached decision is only valid if the key covers everything EnhancedAgent.choose_step
+# reads. If choose_step starts reading another attribute or knowledge set, add it to
+# ZobristHash.key / BOARDS here, or cached agents will silently diverge from uncached ones.
+BOARDS = ('safe', 'visited', 'unsafe', 'unknown', 'breezy', 'stenchy')
+SAFE, VISITED, UNSAFE, UNKNOWN, BREEZY, STENCHY = range(len(BOARDS))
+POSITION = len(BOARDS)
+WUMPUS_LOCATION = POSITION + 1  # one board per inferred shooting direction 0..3
+FLAGS = ('arrow', 'has_gold', 'wumpus_dead', 'wumpus_inferred', 'glitter')
+
+SLOT = struct.Struct('<QQQ')  # key high 64 bits ^ data, key low 64 bits ^ data, data
+VALID = 1 << 16
+DECISION_CODES = {branch: code for code, branch in enumerate(BRANCHES)}
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(size: int) -> Tuple[List[List[int]], List[int]]:
+    """
+    128-bit keys per (board, room) and per flag. Seeded by size alone, so every process (and
+    every run) draws the same keys and hashes can be shared through one table.
+    """
+    rng = random.Random(f"zobrist:{size}")
+    boards = [[rng.getrandbits(128) for _ in range(size * size)] for _ in range(WUMPUS_LOCATION + 4)]
+    return boards, [rng.getrandbits(128) for _ in FLAGS]
+
+
+class ZobristHash:
+    """
+    Hash of an agent's knowledge sets, patched by toggle() whenever a room enters or leaves one of
+    them. Position, flags and settings are cheap enough to fold in per lookup (key()).
+    """
+    __slots__ = ('size', 'boards', 'flags', 'settings', 'value')
+
+    def __init__(self, agent):
+        self.size = agent.size
+        self.boards, self.flags = zobrist_keys(agent.size)
+        settings = repr((agent.size, agent.pits, agent.use_posteriors, agent.risk_prob, agent.risk_threshold))
+        self.settings = int.from_bytes(hashlib.blake2b(settings.encode(), digest_size=16).digest(), 'little')
+        self.rebuild(agent)
+
+    def rebuild(self, agent):
+        """Hashes every knowledge set from scratch, after a change that bypassed toggle()."""
+        value = self.settings
+        for board, name in enumerate(BOARDS):
+            keys = self.boards[board]
+            for x, y in getattr(agent, name):
+                value ^= keys[(y - 1) * self.size + x - 1]
+        self.value = value
+
+    def toggle(self, board: int, cell):
+        x, y = cell
+        self.value ^= self.boards[board][(y - 1) * self.size + x - 1]
+
+    def key(self, agent, glitter: bool) -> int:
+        size = self.size
+        value = self.value ^ self.boards[POSITION][(agent.y - 1) * size + agent.x - 1]
+        if agent.wumpus_location is not None:
+            x, y, d = agent.wumpus_location
+            value ^= self.boards[WUMPUS_LOCATION + d][(y - 1) * size + x - 1]
+        for flag, on in zip(self.flags, (agent.arrow, agent.has_gold, agent.wumpus_dead, agent.wumpus_inferred,
+                                         glitter)):
+            if on:
+                value ^= flag
+        return value
+
+
+class TranspositionTable:
+    """
+    Fixed-size, always-replace table of decisions keyed by 128-bit ZobristHash keys: the low bits
+    pick a slot and the whole key is stored, XORed with the data next to it, so a slot torn by two
+    processes writing at once reads as a miss instead of a wrong action.
+    `buffer` may be shared memory (see create_shared / attach) so pool workers share one table.
+    """
+
+    def __init__(self, slots: int = 1 << 16, buffer=None):
+        if slots & (slots - 1):
+            raise ValueError(f"slots must be a power of two, got {slots}")
+        self.slots = slots
+        self.mask = slots - 1
+        self.buffer = buffer if buffer is not None else bytearray(slots * SLOT.size)
+        self.shm = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def create_shared(cls, slots: int = 1 << 16) -> 'TranspositionTable':
+        from multiprocessing.shared_memory import SharedMemory
+        shm = SharedMemory(create=True, size=slots * SLOT.size)
+        table = cls(slots, shm.buf)
+        table.shm = shm
+        return table
+
+    @classmethod
+    def attach(cls, name: str, slots: int) -> 'TranspositionTable':
+        from multiprocessing.shared_memory import SharedMemory
+        # Only the creator unlinks; workers must not hand the segment to their resource tracker
+        shm = SharedMemory(name=name, track=False)
+        table = cls(slots, shm.buf)
+        table.shm = shm
+        return table
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.shm.name if self.shm is not None else None
+
+    def get(self, key: int) -> Optional[Tuple[str, str]]:
+        """(action, decision) stored under key, or None."""
+        high, low, data = SLOT.unpack_from(self.buffer, (key & self.mask) * SLOT.size)
+        if data & VALID and high ^ data == key >> 64 and low ^ data == key & 0xffffffffffffffff:
+            self.hits += 1
+            return ACTIONS[data & 0xff], BRANCHES[data >> 8 & 0xff]
+        self.misses += 1
+        return None
+
+    def put(self, key: int, action: str, decision: str):
+        data = VALID | DECISION_CODES[decision] << 8 | ACTION_CODES[action]
+        SLOT.pack_into(self.buffer, (key & self.mask) * SLOT.size, (key >> 64) ^ data,
+                       (key & 0xffffffffffffffff) ^ data, data)
+
+    def __getstate__(self):
+        # Pickling a shared table would copy it; ship it by name and attach() on the other side
+        if self.shm is not None:
+            raise TypeError("pass a shared TranspositionTable by name and attach() to it")
+        return self.__dict__
+
+    def close(self, unlink: bool = False):
+        if self.shm is not None:
+            self.buffer = None
+            self.shm.close()
+            if unlink:
+                self.shm.unlink()
+            self.shm = None
@@ -0,0 +1,256 @@
+import itertools
+import json
+import os
+import pickle
+import random
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from corpus import CaveCorpus, episode_seed
+from environment import WumpusEnvironment
+from runner import _process_belief_cache, _process_corpus, run_episode
+
+Episode = Tuple[int, int, str]  # score, steps, outcome, as returned by run_episode
+
+# risk_prob / risk_threshold only act on the posterior risk step, hence use_posteriors in the defaults
+DEFAULT_SPACE = {
+    'risk_prob': [0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5],
+    'risk_threshold': [0, 1, 2, 3, 5, 8, 13],
+}
+DEFAULT_FIXED = {'use_posteriors': True}
+
+
+def config_key(config: dict) -> str:
+    return json.dumps(config, sort_keys=True)
+
+
+class ResultCache:
+    """
+    Episode results per (agent config, max_steps, cave), keyed by the cave's cell codes so a result is
+    reused whichever seed, corpus or index the cave came from. Pickled to `path` like BeliefCache.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.entries: Dict[Tuple[str, int, bytes], Episode] = {}
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                self.entries = pickle.load(f)
+
+    def get(self, key: str, max_steps: int, cave: bytes) -> Optional[Episode]:
+        result = self.entries.get((key, max_steps, cave))
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, max_steps: int, cave: bytes, result: Episode):
+        self.entries[(key, max_steps, cave)] = result
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self.entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+
+def grid(space: Dict[str, list]) -> List[dict]:
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def sample(space: Dict[str, list], n: int, seed=0) -> List[dict]:
+    """Up to n distinct configs drawn uniformly from the grid."""
+    configs = grid(space)
+    return random.Random(seed).sample(configs, min(n, len(configs)))
+
+
+def _evaluate_chunk(args) -> Tuple[str, List[Tuple[int, Episode]]]:
+    key, config, indices, settings = args
+    agent_kwargs = dict(config)
+    if settings['belief_cache'] and agent_kwargs.get('use_posteriors'):
+        agent_kwargs['belief_cache'] = _process_belief_cache(settings['belief_cache'], None)
+    corpus = _process_corpus(settings['corpus']) if settings['corpus'] else None
+    results = []
+    for index in indices:
+        if corpus is not None:
+            result = run_episode(None, settings['max_steps'], agent_kwargs, corpus.size, cave=corpus.cave(index))
+        else:
+            result = run_episode(episode_seed(settings['seed'], index), settings['max_steps'], agent_kwargs,
+                                 settings['size'])
+        results.append((index, result))
+    return key, results
+
+
+class Tuner:
+    """
+    Successive halving over agent configs. Every config plays the same caves (seeded or from a
+    corpus); each rung keeps the best 1/eta by mean score and gives the survivors eta times as
+    many caves. Results already in the ResultCache are never replayed.
+    """
+
+    def __init__(self, fixed: Optional[dict] = None, seed: int = 0, size: int = 4, corpus: Optional[str] = None,
+                 max_steps: int = 1000, workers: Optional[int] = None, cache: Optional[ResultCache] = None,
+                 belief_cache: Optional[int] = 100_000, chunk_size: int = 100):
+        self.fixed = dict(DEFAULT_FIXED if fixed is None else fixed)
+        self.workers = workers or os.process_cpu_count() or 1
+        self.cache = cache if cache is not None else ResultCache()
+        self.chunk_size = chunk_size
+        self.settings = {'seed': seed, 'size': size, 'corpus': corpus, 'max_steps': max_steps,
+                         'belief_cache': belief_cache}
+        self.corpus = CaveCorpus(corpus) if corpus else None
+        self.caves: List[bytes] = []
+        self.pool = None
+
+    def cave(self, index: int) -> bytes:
+        """Cache identity of cave `index`: its cell codes."""
+        while len(self.caves) <= index:
+            i = len(self.caves)
+            if self.corpus is not None:
+                self.caves.append(bytes(self.corpus.cave(i)))
+            else:
+                env = WumpusEnvironment(self.settings['size'], seed=episode_seed(self.settings['seed'], i))
+                self.caves.append(env.cave_bytes())
+        return self.caves[index]
+
+    def _map(self, tasks: List[tuple]) -> Iterator[tuple]:
+        if self.workers == 1 or len(tasks) == 1:
+            return map(_evaluate_chunk, tasks)
+        if self.pool is None:
+            from multiprocessing import Pool
+            self.pool = Pool(processes=self.workers)
+        return self.pool.imap_unordered(_evaluate_chunk, tasks)
+
+    def evaluate(self, configs: List[dict], episodes: int) -> Dict[str, List[Episode]]:
+        """Results of every config on caves 0..episodes-1, playing only what the cache lacks."""
+        if self.corpus is not None and episodes > len(self.corpus):
+            raise ValueError(f"{self.corpus.path} holds {len(self.corpus)} caves, {episodes} episodes requested")
+        results: Dict[str, List[Optional[Episode]]] = {}
+        tasks = []
+        max_steps = self.settings['max_steps']
+        for config in configs:
+            full = {**self.fixed, **config}
+            key = config_key(full)
+            found = results[key] = [self.cache.get(key, max_steps, self.cave(i)) for i in range(episodes)]
+            missing = [i for i, result in enumerate(found) if result is None]
+            for start in range(0, len(missing), self.chunk_size):
+                tasks.append((key, full, missing[start:start + self.chunk_size], self.settings))
+        for key, played in self._map(tasks):
+            for index, result in played:
+                results[key][index] = result
+                self.cache.put(key, max_steps, self.cave(index), result)
+        return results
+
+    def successive_halving(self, configs: List[dict], min_episodes: int = 100, max_episodes: int = 10_000,
+                           eta: int = 3) -> List[dict]:
+        """
+        Returns one report per rung: the episodes played per config and every surviving
+        config's summary, best first. The last rung's first entry is the winner.
+        """
+        rungs = []
+        episodes = min_episodes
+        survivors = list(configs)
+        while True:
+            results = self.evaluate(survivors, episodes)
+            ranked = sorted((summarize(config, results[config_key({**self.fixed, **config})]) for config in survivors),
+                            key=lambda row: (-row['mean_score'], -row['win_rate']))
+            rungs.append({'episodes': episodes, 'configs': ranked})
+            if len(survivors) == 1 or episodes >= max_episodes:
+                return rungs
+            survivors = [row['config'] for row in ranked[:max(1, len(ranked) // eta)]]
+            episodes = min(max_episodes, episodes * eta)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.corpus is not None:
+            self.corpus.close()
+            self.corpus = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def summarize(config: dict, results: List[Episode]) -> dict:
+    scores = [score for score, _, _ in results]
+    return {
+        'config': config,
+        'episodes': len(results),
+        'mean_score': sum(scores) / len(scores),
+        'win_rate': sum(outcome == 'escaped' for _, _, outcome in results) / len(results),
+    }
+
+
+def parse_value(text: str):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return {'true': True, 'false': False}.get(text.lower(), text)
+
+
+def parse_assignments(items: Optional[List[str]], multi: bool) -> dict:
+    """NAME=V1,V2,... (multi) or NAME=V pairs into a dict."""
+    out = {}
+    for item in items or []:
+        name, _, values = item.partition('=')
+        parsed = [parse_value(v) for v in values.split(',')]
+        out[name] = parsed if multi else parsed[0]
+    return out
+
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Tune EnhancedAgent settings by successive halving.")
+    parser.add_argument('-p', '--param', action='append', metavar='NAME=V1,V2,...',
+                        help="Search these values of an agent argument (repeatable; default: risk_prob, "
+                             "risk_threshold)")
+    parser.add_argument('-f', '--fixed', action='append', metavar='NAME=V',
+                        help="Agent argument held fixed for every config (default: use_posteriors=true)")
+    parser.add_argument('--samples', type=int, default=None, help="Start from this many random configs, not the grid")
+    parser.add_argument('--min-episodes', type=int, default=100)
+    parser.add_argument('--max-episodes', type=int, default=10_000)
+    parser.add_argument('--eta', type=int, default=3, help="Keep the best 1/eta each rung")
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('--size', type=int, default=4, help="Cave width and height")
+    parser.add_argument('--corpus', default=None, metavar='FILE', help="Play the caves of this corpus")
+    parser.add_argument('--max-steps', type=int, default=1000)
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--cache', default=None, metavar='FILE', help="Load and save per-(config, max steps, cave) results")
+    parser.add_argument('--json', action='store_true', help="Print every rung as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    space = parse_assignments(args.param, multi=True) or DEFAULT_SPACE
+    fixed = parse_assignments(args.fixed, multi=False) if args.fixed else None
+    configs = sample(space, args.samples, args.seed) if args.samples else grid(space)
+    cache = ResultCache(args.cache)
+    with Tuner(fixed, args.seed, args.size, args.corpus, args.max_steps, args.workers, cache) as tuner:
+        rungs = tuner.successive_halving(configs, args.min_episodes, args.max_episodes, args.eta)
+    if args.cache:
+        cache.save()
+    if args.json:
+        json.dump(rungs, sys.stdout, indent=2)
+        print()
+        return
+    for rung in rungs:
+        best = rung['configs'][0]
+        print(f"{len(rung['configs']):4d} configs x {rung['episodes']:6d} episodes: best {best['config']} "
+              f"mean score {best['mean_score']:.2f}, win rate {best['win_rate']:.2%}")
+    print(f"Cache: {cache.hits} hits, {cache.misses} misses")
+
+
+if __name__ == "__main__":
+    main()